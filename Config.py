@@ -16,12 +16,54 @@ class Config:
         self.outfile                    = None          # output file, if asked for
         self.rows  :list[ list[int] ]   = [ [] for i in range(rown) ] # Empty for now
         self.cols  :list[ list[int] ]   = [ [] for i in range(coln) ] #    These are [ [1, 3, 2], [], [10], etc ] one per row/col
+                                                        #    and become tuples once they're all read
         self.row_hdrs       :list[str]  = [ ]           # will generate after reading config file
         self.col_hdrs       :list[str]  = [ ]           #    Both are just the text to add, can be generated up front 
         self.row_hdr_width  :int        = 1             # till we read otherwise from config file
         self.col_hdr_height :int        = 1
+        self.rows_total     :list[int]  = [ ]           # sum(hints) + len(hints) - 1 : width the hints need at minimum
+        self.cols_total     :list[int]  = [ ]           #    The hints never change, so these are
+        self.rows_max       :list[int]  = [ ]           #    generated once after reading config file
+        self.cols_max       :list[int]  = [ ]           #    max(hints), 0 if there are none
+        self.rows_plan      :list[tuple] = [ ]          # ( starts, tails ) per row/col for the solver: hint k can't start
+        self.cols_plan      :list[tuple] = [ ]          #    before starts[k] or less than tails[k] from the end of the line
+        self.rows_key       :list[tuple] = [ ]          # tuple( hints ) per row/col, what the solver's caches key on
+        self.cols_key       :list[tuple] = [ ]
+        self.rows_empty     :list[int]  = [ ]           # indexes of the rows/cols with no hints at all (all BLANK)
+        self.cols_empty     :list[int]  = [ ]
+        self.rows_boxes     :list[int]  = [ ]           # bitmask per row/col of the cells its hints fill no matter
+        self.cols_boxes     :list[int]  = [ ]           #    where they go (the 'simple boxes' overlap of an empty line)
+        self.rows_line      :list[tuple] = [ ]          # ( hints, total, max, plan, key ) per row/col, everything
+        self.cols_line      :list[tuple] = [ ]          #    solve_slice() needs about a line's hints in one lookup
         
 
+def _open_outfile( args: argparse.Namespace ):
+    "Open the output file, exits if we can't - with a big buffer, --force can write a lot of boards"
+    try: 
+        return open( args.outfile, 'w', buffering = 1 << 20 )
+    except Exception as ex:
+        print( f"*** Couldn't open output file '{args.outfile}':", file = sys.stderr )
+        print( f"{ex}", file = sys.stderr )
+        sys.exit( 3 )
+
+
+# lines starting with any of these are comments
+_COMMENT_PREFIXES = ( "#", ";", "//" )
+
+# section keywords, case insensitive (compared lowercased)
+_ROW_HEADERS    = frozenset( { "rows:" } )
+_COL_HEADERS    = frozenset( { "cols:", "columns:" } )
+_DONE_TOKENS    = frozenset( { "done" } )
+
+# hints can be separated by commas or spaces
+_COMMA_TO_SPACE = str.maketrans( ',', ' ' )
+
+# header sizing - how wide a line's hints print, however many digits each has
+def _hints_width( hints: list[int] ) -> int:
+    "Width of the hints printed with a space after each"
+    return sum( len( str( n ) ) + 1 for n in hints )
+
+
 class ParseState( Enum ):
     SIZE        = 1
     ROWHEADER   = 2
@@ -29,146 +71,195 @@ class ParseState( Enum ):
     COLHEADER   = 4
     COLS        = 5
     DONE        = 6
+
+# bound once so the handlers don't look up ParseState.X on every line
+_SIZE, _ROWHDR, _ROWS, _COLHDR, _COLS, _DONE = ParseState
+
+
+class ParseContext:
+    """What the ParseState handlers share while reading the infile"""
+
+    def __init__( self, args: argparse.Namespace ) -> None:
+        self.args                       = args
+        self.config         :Config     = None          # created once we've read the size line
+        self.idx            :int        = 0             # which row/col we're on
+
+def _parse_hints( line: str, line_no: int, what: str, hints: list[int], length: int ) -> None:
+    "Append the numbers in a Rows/Cols line to hints, exits on bad input or if they can't fit in length cells"
+    if line == "0":     # allow just '0' as blank line
+        return
+    tokens = line.translate( _COMMA_TO_SPACE ).split()   # split on runs of , or whitespace
+    for s in tokens:
+        try:
+            n = int( s )
+        except ValueError:
+            print( f"Line {line_no}: '{line}': '{s}' is not an integer!", file = sys.stderr )
+            print( f"     Are you missing a line?", file = sys.stderr )
+            sys.exit( 2 )
+        if n < 1:
+            print( f"Line {line_no}: '{line}': each {what} entry must be positive non-zero integer!", file = sys.stderr )
+            print( f"     Are you missing a line?", file = sys.stderr )
+            sys.exit( 2 )
+        if n > length:          # one hint can't be longer than the line
+            print( f"Line {line_no}: '{line}': {what} entry needs {n} cells but there are only {length}!", file = sys.stderr )
+            sys.exit( 2 )
+        hints.append( n )
+    need = sum( hints ) + len( hints ) - 1
+    if need > length:
+        print( f"Line {line_no}: '{line}': {what} entry needs {need} cells but there are only {length}!", file = sys.stderr )
+        sys.exit( 2 )
+
+#
+# ParseState handlers - each takes ( line, line_no, ctx ) and returns the next ParseState
+#
+
+def _parse_size( line: str, line_no: int, ctx: ParseContext ) -> ParseState:
+    # expect [rows] x [cols] 
+    if line == "":
+        return _SIZE
+    rc = line.split( 'x' )
+    try:
+        rown, coln = int( rc[0] ), int( rc[1] )
+    except Exception as ex:    # probably ValueError
+        print( f"Line {line_no}: '{line}':  expected '[rows]x[cols]' like '10x10'", file = sys.stderr )
+        sys.exit( 2 )
+    if rown < 1 or coln < 1:
+        print( f"Line {line_no}: '{line}':  [rows]x[cols] must be positive non-zero!", file = sys.stderr )
+        sys.exit( 2 )
+    # print( f"{coln} x {rown}")
+    ctx.config      = Config( rown, coln )
+    ctx.config.args = ctx.args
+    return _ROWHDR
+
+def _parse_row_header( line: str, line_no: int, ctx: ParseContext ) -> ParseState:
+    if line == "":
+        return _ROWHDR
+    if line[-1] != ':' or line.lower() not in _ROW_HEADERS:
+        print( f"Line {line_no}: '{line}':  expected 'Rows:' header", file = sys.stderr )
+        sys.exit( 2 )
+    ctx.idx = 0
+    return _ROWS
+
+def _parse_rows( line: str, line_no: int, ctx: ParseContext ) -> ParseState:
+    config = ctx.config
+    r : list[int] = config.rows[ ctx.idx ]
+    width :int = 1
+    _parse_hints( line, line_no, "Rows", r, config.coln )
+    width += _hints_width( r )      # each number and a space
+    if width > config.row_hdr_width:
+        config.row_hdr_width = width
+    ctx.idx += 1
+    if ctx.idx >= config.rown:
+        return _COLHDR
+    return _ROWS
+
+def _parse_col_header( line: str, line_no: int, ctx: ParseContext ) -> ParseState:
+    if line == "":
+        return _COLHDR
+    if line[-1] != ':' or line.lower() not in _COL_HEADERS:
+        print( f"Line {line_no}: '{line}':  expected 'Cols:' or 'Columns:' header", file = sys.stderr )
+        sys.exit( 2 )
+    ctx.idx = 0
+    return _COLS
+
+def _parse_cols( line: str, line_no: int, ctx: ParseContext ) -> ParseState:
+    config = ctx.config
+    c = config.cols[ ctx.idx ]
+    height  = 0
+    _parse_hints( line, line_no, "Cols", c, config.rown )
+    height += _hints_width( c ) - 1     # number, then maybe space - one of them doesn't need a space
+    if height > config.col_hdr_height:
+        config.col_hdr_height = height
+    ctx.idx += 1
+    if ctx.idx >= config.coln:
+        return _DONE
+    return _COLS
+
+def _parse_done( line: str, line_no: int, ctx: ParseContext ) -> ParseState:
+    if line == "":
+        return _DONE
+    if line.lower() not in _DONE_TOKENS:
+        print( f"Line {line_no}: '{line}': expected 'DONE'", file = sys.stderr )
+        sys.exit( 2 )
+    return _DONE
+
+# which handler to call for each ParseState
+_DISPATCH = {
+    _SIZE       : _parse_size,
+    _ROWHDR     : _parse_row_header,
+    _ROWS       : _parse_rows,
+    _COLHDR     : _parse_col_header,
+    _COLS       : _parse_cols,
+    _DONE       : _parse_done,
+}
+
     
 def read_config_file( args: argparse.Namespace ):
     
     # open the file
     try: 
-        with open( args.infile ) as f:
-            lines = [ l.strip() for l in f.readlines() ]
+        with open( args.infile, 'r', encoding = 'utf-8' ) as f:
+            raw_lines = f.read().splitlines()
     except Exception as ex:
         print( f"*** Couldn't open {args.infile}:", file = sys.stderr )
         print( f"{ex}", file = sys.stderr )
         sys.exit( 1 )
     
-    state :ParseState = ParseState.SIZE
-    line_no = 0
-    for line in lines:
-        line_no += 1
+    ctx     = ParseContext( args )
+    state   :ParseState = _SIZE
+    for line_no, raw in enumerate( raw_lines, 1 ):
+        line = raw.strip()
         # print( state, line )        
 
         # skip comments
-        if line.startswith( "#" ) or line.startswith( ";" ) or line.startswith( "//" ):
+        if line.startswith( _COMMENT_PREFIXES ):
             continue
         
-        match state:
-            # expect [rows] x [cols] 
-            case ParseState.SIZE:
-                if line == "":
-                    continue
-                rc = line.split( 'x' )
-                try:
-                    rown, coln = int( rc[0] ), int( rc[1] )
-                except Exception as ex:    # probably ValueError
-                    print( f"Line {line_no}: '{line}':  expected '[rows]x[cols]' like '10x10'", file = sys.stderr )
-                    sys.exit( 2 )
-                if rown < 1 or coln < 1:
-                    print( f"Line {line_no}: '{line}':  [rows]x[cols] must be positive non-zero!", file = sys.stderr )
-                    sys.exit( 2 )
-                # print( f"{coln} x {rown}")
-                config          = Config( rown, coln )
-                config.args     = args
-                state           = ParseState.ROWHEADER
-             
-            case ParseState.ROWHEADER:
-                if line == "":
-                    continue
-                uline = line.upper()
-                if uline != "ROWS:":
-                    print( f"Line {line_no}: '{line}':  expected 'Rows:' header", file = sys.stderr )
-                    sys.exit( 2 )
-                state       = ParseState.ROWS
-                idx :int    = 0
-            
-            case ParseState.ROWS:
-                r : list[int] = config.rows[ idx ]
-                width :int = 1
-                if line != "0":     # allow just '0' as blank line
-                    try:
-                        split = line.replace( ',', ' ' ).split( ' ' )   # split on , or space
-                        for s in split:
-                            n = int( s )
-                            if n < 1:
-                                print( f"Line {line_no}: '{line}': each Rows entry must be positive non-zero integer!", file = sys.stderr )
-                                print( f"     Are you missing a line?", file = sys.stderr )
-                                sys.exit( 2 )
-                            r.append( n )
-                            width += 2   # the number and a space
-                            if n > 9:
-                                width += 1
-                    except Exception as ex:
-                        print( f"Line {line_no}: '{line}': each Rows entry must be positive non-zero integer!", file = sys.stderr )
-                        print( f"     Are you missing a line?", file = sys.stderr )
-                        sys.exit( 2 )
-                if width > config.row_hdr_width:
-                    config.row_hdr_width = width
-                idx += 1
-                if idx >= config.rown:
-                    state = ParseState.COLHEADER
-            
-            case ParseState.COLHEADER:
-                if line == "":
-                    continue
-                uline = line.upper()
-                if uline != "COLS:" and uline != "COLUMNS:":
-                    print( f"Line {line_no}: '{line}':  expected 'Cols:' or 'Columns:' header", file = sys.stderr )
-                    sys.exit( 2 )
-                state = ParseState.COLS
-                idx   = 0
-            
-            case ParseState.COLS:
-                c = config.cols[ idx ]
-                height  = 0
-                if line != "0":     # allow just '0' as blank line
-                    try:
-                        split = line.replace( ',', ' ' ).split( ' ' )   # split on , or space
-                        for s in split:
-                            n = int( s )
-                            if n < 1:
-                                print( f"Line {line_no}: '{line}': each Cols entry must be positive non-zero integer!", file = sys.stderr )
-                                print( f"     Are you missing a line?", file = sys.stderr )
-                                sys.exit( 2 )
-                            c.append( n )
-                            height += 2         # number, then maybe space
-                            if n > 9:
-                                height += 1     # need second digit
-                    except Exception as ex:
-                        print( f"Line {line_no}: '{line}': each Cols entry must be positive non-zero integer!", file = sys.stderr )
-                        print( f"     Are you missing a line?", file = sys.stderr )
-                        sys.exit( 2 )
-                height -= 1   # one of them doesn't need a space
-                if height > config.col_hdr_height:
-                    config.col_hdr_height = height
-                idx += 1
-                if idx >= config.coln:
-                    state = ParseState.DONE
-
-            case ParseState.DONE:
-                if line == "":
-                    continue
-                uline = line.upper()
-                if uline != "DONE":
-                    print( f"Line {line_no}: '{line}': expected 'DONE'", file = sys.stderr )
-                    sys.exit( 2 )
-        # end of match state
-
-        if args.outfile:
-            try: 
-                config.outfile = open( args.outfile, 'w' )
-            except Exception as ex:
-                print( f"*** Couldn't open output file '{args.outfile}':", file = sys.stderr )
-                print( f"{ex}", file = sys.stderr )
-                sys.exit( 3 )
+        state = _DISPATCH[ state ]( line, line_no, ctx )
                 
+    config = ctx.config
+    if args.outfile:
+        config.outfile = _open_outfile( args )
+
+    # We've parsed everything, so work out what the solver needs to know about each row/col's hints
+    for hints, totals, maxes, plans, keys, boxes, length in (
+            ( config.rows, config.rows_total, config.rows_max, config.rows_plan, config.rows_key, config.rows_boxes, config.coln ),
+            ( config.cols, config.cols_total, config.cols_max, config.cols_plan, config.cols_key, config.cols_boxes, config.rown ) ):
+        for h in hints:
+            totals.append( sum( h ) + len( h ) - 1 )    # sum(n) + (n-1) spaces
+            keys.append( tuple( h ) )
+            maxes.append( max( h, default = 0 ) )
+            starts, tails, need = [], [], 0
+            for n in h:                                 # [ 1, 2, 3 ] starts [ 0, 2, 5 ]
+                starts.append( need )
+                need += n + 1
+            need = 0
+            for n in reversed( h ):                     # [ 1, 2, 3 ] tails [ 8, 6, 3 ]
+                need += n
+                tails.append( need )
+                need += 1
+            tails.reverse()
+            plans.append( ( starts, tails ) )
+            # packed all the way left hint k starts at starts[k], all the way right it's slack
+            #    further on - whatever it covers both ways it covers every way
+            slack, box = length - totals[-1], 0
+            for n, start in zip( h, starts ):
+                if n > slack:
+                    box |= ( ( 1 << ( n - slack ) ) - 1 ) << ( start + slack )
+            boxes.append( box )
+    # the hints never change from here on, so freeze them
+    config.rows = [ tuple( h ) for h in config.rows ]
+    config.cols = [ tuple( h ) for h in config.cols ]
+    config.rows_empty = [ y for y, h in enumerate( config.rows ) if not h ]
+    config.cols_empty = [ x for x, h in enumerate( config.cols ) if not h ]
+    config.rows_line  = list( zip( config.rows, config.rows_total, config.rows_max, config.rows_plan, config.rows_key ) )
+    config.cols_line  = list( zip( config.cols, config.cols_total, config.cols_max, config.cols_plan, config.cols_key ) )
 
-    # We've parsed everything, now generate the row and column headers
+    # now generate the row and column headers
 
     # rows are easy, just add them as we generate them
     for y in range( config.rown ):
-        hdr = ""
-        for n in config.rows[y]:
-            hdr = hdr + str(n) + " "
-        hdr = hdr.rjust( config.row_hdr_width )
+        hdr = ( " ".join( map( str, config.rows[y] ) ) + " " ).rjust( config.row_hdr_width )
         config.row_hdrs.append( hdr + "|" )
     
     # cols are harder - they need to be basically rotated 90
@@ -180,24 +271,22 @@ def read_config_file( args: argparse.Namespace ):
     #                 " | | "
     #                 "2|4|2"
     #                 "--------"
-    hdrs = [ [ ' ' for x in range(config.coln) ] for y in range(config.col_hdr_height) ]  # [ [line 1 entries ], [ line 2 entries ], ... ]
-    for x in range(config.coln):               # for each col header
-        y = config.col_hdr_height - ( len(config.cols[x]) * 2 - 1 )  # leave room for spaces
-        for n in config.cols[x]:    # leave space for 2 digit numbers
-            if n >= 10:
-                y -= 1
-        for n in config.cols[x]:
-            if n >= 10:
-                hdrs[y][x] = str( int( n/10 ) )
-                n = n % 10
+    coln = config.coln
+    hdrs = bytearray( b' ' * ( config.col_hdr_height * coln ) )    # line 1 entries, then line 2 entries, ...
+    for x in range(coln):                      # for each col header
+        col         = config.cols[x]
+        y = config.col_hdr_height - ( _hints_width( col ) - 1 )    # same height _parse_cols() made room for
+        # every digit gets its own cell - divmod( n, 10 ) would only ever split off two
+        for n in col:
+            for digit in str( n ).encode( 'ascii' ):   # one digit a line, top down
+                hdrs[y*coln + x] = digit
                 y += 1
-            hdrs[y][x] = f"{n}"
-            y += 2
+            y += 1                                      # and a space
     # now just join then with |
     left = " " * len( config.row_hdrs[0] )
     for y in range( config.col_hdr_height ):
         # enough on the left for row headers
-        config.col_hdrs.append( left + "|".join( hdrs[y]) )
+        config.col_hdrs.append( left + "|".join( hdrs[y*coln:(y+1)*coln].decode( 'ascii' ) ) )
     # and add a "--------------" at the bottom
     config.col_hdrs.append( left.ljust( len( config.col_hdrs[0] ), '-' ) )
 
@@ -13,7 +13,8 @@ VERSION = 1.03
 
 # import standard libs
 import argparse
-from   enum import Enum
+import itertools
+import math
 import random
 import sys
 import time
@@ -41,6 +42,13 @@ VERBOSE_SOME = 1
 VERBOSE_MORE = 2
 VERBOSE_ALL  = 5        # leave room
 
+# colorama bits for what can get printed every step (with --force that's a lot of
+#    steps) - put together once here instead of looked up each time
+STEP_ANSI    = Fore.CYAN
+DEAD_ANSI    = Fore.RED
+RESET_ANSI   = Style.RESET_ALL
+STUCK_ANSI   = f"{Fore.RED}{Style.BRIGHT}Unsolved, but couldn't find anything else to do.{Style.RESET_ALL}"
+
 # ----------------------------------------------------------------------------
 # Our Solve Exceptions
 # ----------------------------------------------------------------------------
@@ -59,17 +67,41 @@ class Board:
     UNKNOWN = 0
     FILLED  = 1
     BLANK   = 2
+    UNKNOWN_BYTE, FILLED_BYTE, BLANK_BYTE = b'\x00', b'\x01', b'\x02'   # same, for working on slice.tobytes()
+    
+    # recursive_solve() results keyed by ( hints, width, filled bits, blank bits ) - the answer
+    #    only depends on those, so rows and cols that get re-solved without really changing are free.
+    #    Kept least recently used first (dicts keep insertion order), so when it's full
+    #    the one dropped is the one that hasn't come up for longest.  Slices with no legal
+    #    position at all are kept as () - in --force the same dead end turns up under many guesses.
+    slice_cache     :dict   = {}
+    SLICE_CACHE_MAX :int    = 50000
+    fill_patterns   :dict   = {}            # hints key -> fill_pattern(), the hints never change
+    placements      :dict   = {}            # ( hints key, width ) -> placement_table(), None if there wasn't one
+    PLACEMENTS_MAX  :int    = 32768         # about where tally_legal_positions() gets quicker than filtering the table
+    PROBES_MAX      :int    = 16            # more positions than this and a guess just tries them in order
+    MOVES_MAX       :int    = 0xFFFFFFFF    # row_moves / col_moves are uint32, any more positions than that is just 'lots'
+    rng             :random.Random = random.Random()    # pick_guess()'s tie breaks, __main__ seeds it with --seed
     
     def __init__( self ):
         self.grid           :numpy.array    = None      # the board state
+        self.grid_T         :numpy.array    = None      # transposed copy of grid so cols are contiguous, kept in sync
         self.step           : int           = 1         # what solving step
         self.row_solved     :numpy.array    = None      # whether each row is solved and can be ignored    
         self.col_solved     :numpy.array    = None      # whether each col is solved and can be ignored
-        self.row_changed    :numpy.array    = None      # whether each row has had changes
-        self.col_changed    :numpy.array    = None      # whether each col has had changes
+        self.rows_done      :int            = 0         # how many of row_solved / col_solved are set,
+        self.cols_done      :int            = 0         #    so checking for done doesn't scan them
+        self.dirty_rows     :set[int]       = set()     # rows with changes we haven't looked at yet
+        self.dirty_cols     :set[int]       = set()     # cols with changes we haven't looked at yet
+        self.row_filled     :list[int]      = []        # slice_bits() of every row and col, kept in sync
+        self.row_blank      :list[int]      = []        #    with grid so solving never has to pack them
+        self.col_filled     :list[int]      = []
+        self.col_blank      :list[int]      = []
         self.row_moves      :numpy.array    = None      # how many possible moves in this row if not done
         self.col_moves      :numpy.array    = None      # how many possible moves in this col if not done
-        self.forced         :list           = []        # forced moves we've tried
+        self.buffers        :tuple          = ()        # flat byte views of the arrays checkpoint() saves, in order
+        self.row_names      :list[str]      = []        # "Row  1" etc for messages, made once by blank()
+        self.col_names      :list[str]      = []        #    instead of for every line solved
     
     # make a new blank board
     def blank() -> 'Board':
@@ -77,87 +109,571 @@ class Board:
         board               = Board()
         board.step          = 1
         board.grid          = numpy.zeros( ( config.rown, config.coln ), numpy.uint8 )   # 0 is UNKNOWN
+        board.grid_T        = numpy.zeros( ( config.coln, config.rown ), numpy.uint8 )
         board.row_solved    = numpy.zeros( config.rown, numpy.uint8 )       # nothing has been solved
         board.col_solved    = numpy.zeros( config.coln, numpy.uint8 )
-        board.row_changed   = numpy.ones(  config.rown, numpy.uint8 )       # everything has changed!
-        board.col_changed   = numpy.ones(  config.coln, numpy.uint8 )
+        board.rows_done     = 0
+        board.cols_done     = 0
+        board.dirty_rows    = set( range( config.rown ) )                   # everything has changed!
+        board.dirty_cols    = set( range( config.coln ) )
+        board.row_filled    = [ 0 ] * config.rown                           # all UNKNOWN, no bits
+        board.row_blank     = [ 0 ] * config.rown
+        board.col_filled    = [ 0 ] * config.coln
+        board.col_blank     = [ 0 ] * config.coln
         board.row_moves     = numpy.zeros( config.rown, numpy.uint32 )
         board.col_moves     = numpy.zeros( config.coln, numpy.uint32 )
+        board.row_names     = [ f"Row {y+1:>2}" for y in range( config.rown ) ]
+        board.col_names     = [ f"Col {x+1:>2}" for x in range( config.coln ) ]
+
+        # rule 'zero' - rows/cols with no hints are all BLANK, so do them all up front and never look again
+        if config.rows_empty or config.cols_empty:
+            board.grid[ config.rows_empty, : ] = Board.BLANK
+            board.grid[ :, config.cols_empty ] = Board.BLANK
+            board.row_solved[ config.rows_empty ] = True
+            board.col_solved[ config.cols_empty ] = True
+            board.dirty_rows.difference_update( config.rows_empty )
+            board.dirty_cols.difference_update( config.cols_empty )
+        # and the cells every line's hints cover wherever they go - that's all the FILLED
+        #    the first look at an empty line would find, so it can start from there
+        for y, box in enumerate( config.rows_boxes ):
+            if box:
+                board.grid[ y, Board.bit_indexes( box ) ] = Board.FILLED
+        for x, box in enumerate( config.cols_boxes ):
+            if box:
+                board.grid[ Board.bit_indexes( box ), x ] = Board.FILLED
+        # those went straight over the no-hint lines' BLANKs, so any of them a box landed in
+        #    is dirty - the first pass finds a solved line there and calls it illegal
+        if config.rows_empty or config.cols_empty:
+            empty_cols = sum( 1 << x for x in config.cols_empty )
+            empty_rows = sum( 1 << y for y in config.rows_empty )
+            for box in config.rows_boxes:
+                board.dirty_cols.update( Board.bit_indexes( box & empty_cols ) )
+            for box in config.cols_boxes:
+                board.dirty_rows.update( Board.bit_indexes( box & empty_rows ) )
+        board.grid_T[:] = board.grid.T
+        board.buffers   = tuple( memoryview( a ).cast( 'B' ) for a in
+                                 ( board.grid, board.grid_T, board.row_solved, board.col_solved, board.row_moves, board.col_moves ) )
+        board.count_done()
+        board.sync_bits()
         return board
        
-    def copy( self ) -> 'Board':
-        "Return deep copy Board from passed Board"
-        board = Board()
-        board.grid          = numpy.copy( self.grid )
-        board.row_solved    = numpy.copy( self.row_solved )
-        board.col_solved    = numpy.copy( self.col_solved )
-        board.row_changed   = numpy.copy( self.row_changed )
-        board.col_changed   = numpy.copy( self.col_changed )
-        board.row_moves     = numpy.copy( self.row_moves )
-        board.col_moves     = numpy.copy( self.col_moves )
-        board.step          = self.step + 1
-        board.forced        = self.forced
-        return board
+    def checkpoint( self ) -> tuple:
+        """
+        Snapshot of this Board's state for restore() - just bytes and tuples, no new Board or arrays.
+        Everything derived from grid goes in too, so restore() is only copies, never a recount.
+        The row / col bitmasks are ints, which never change in place, so their tuples only
+            copy references - the rows a guess doesn't touch are shared, not copied.
+        A few microseconds either way even at 60x60, less than logging every cell change
+            as it happens would cost - a guess usually changes most of the board.
+        """
+        return ( self.grid.tobytes(), self.grid_T.tobytes(), self.row_solved.tobytes(), self.col_solved.tobytes(),
+                 self.row_moves.tobytes(), self.col_moves.tobytes(),
+                 frozenset( self.dirty_rows ), frozenset( self.dirty_cols ),
+                 self.rows_done, self.cols_done,
+                 tuple( self.row_filled ), tuple( self.row_blank ), tuple( self.col_filled ), tuple( self.col_blank ) )
+
+    def restore( self, snap :tuple ) -> None:
+        "Put a checkpoint() snapshot back into this Board in place (step keeps counting)"
+        ( grid, grid_T, row_solved, col_solved, row_moves, col_moves, dirty_rows, dirty_cols,
+          self.rows_done, self.cols_done, row_filled, row_blank, col_filled, col_blank ) = snap
+        # the arrays get copied straight back into through byte views made once by blank() -
+        #    a plain memcpy each, no numpy array made around the bytes first
+        for buffer, data in zip( self.buffers, ( grid, grid_T, row_solved, col_solved, row_moves, col_moves ) ):
+            buffer[:]       = data
+        self.dirty_rows     = set( dirty_rows )
+        self.dirty_cols     = set( dirty_cols )
+        self.row_filled     = list( row_filled )
+        self.row_blank      = list( row_blank )
+        self.col_filled     = list( col_filled )
+        self.col_blank      = list( col_blank )
+
+    def count_done( self ) -> None:
+        "Recount rows_done / cols_done, after something wrote row_solved / col_solved directly"
+        self.rows_done      = int( numpy.count_nonzero( self.row_solved ) )
+        self.cols_done      = int( numpy.count_nonzero( self.col_solved ) )
+
+    def sync_bits( self ) -> None:
+        "Rebuild the row/col bitmasks from grid, after something wrote grid directly"
+        self.row_filled, self.row_blank = map( list, zip( *Board.lines_bits( self.grid ) ) )
+        self.col_filled, self.col_blank = map( list, zip( *Board.lines_bits( self.grid_T ) ) )
+
+    def note_changes( line :int, filled :int, changed :list[int], cross_filled :list[int], cross_blank :list[int] ) -> None:
+        """
+        Line number line just changed the cells in changed, and its new filled bits are filled,
+            so set its bit in each crossing line's bitmasks to match.
+        """
+        bit = 1 << line
+        for x in changed:
+            if ( filled >> x ) & 1:
+                cross_filled[x] |= bit
+                cross_blank[x]  &= ~bit
+            else:
+                cross_blank[x]  |= bit
+                cross_filled[x] &= ~bit
 
     #
     # Class methods
     # 
-    def get_all_positions( left :int, right :int, hints :list[int] ) ->  list[int]:
+    def get_legal_positions( left :int, right :int, hints :list[int], plan :tuple, filled_bits :int, blank_bits :int ) ->  list[int]:
         """
-        Given a starting max left, a starting max right, and the hints, generate all possible
-            fill positions.
+        Given a starting max left, a starting max right, the hints, and the slice as bitmasks
+            (see slice_bits()), generate every legal fill position in left to right order.
+        plan is the row/col's ( starts, tails ) from config.
+        Legal means no block sits on a BLANK and no FILLED cell is left uncovered.
+        Checking as we place each block lets us skip everything to the right of a bad
+            placement instead of generating every combination and testing it after.
+        The same list is yielded every time, copy it if you need to keep it.
         """
-        # Figure out the (inclusive) left possible pos for each hint
-        left2 = left                        # if left is 0 and hints is [ 1, 2, 3],
-        hints_pos = [ ]                     #   hints_pos is [ 0, 2, 5 ]
-        for h in hints:                     #  * _ * * _ * * * _ .
-            hints_pos.append( left2 )
-            left2 += h + 1  # for the BLANK
-            
-        # figure out the (inclusive) right possible pos for each hint
-        right2 = right + 1                  # If right is 10 and hints is [ 1, 2, 3 ]
-        hints_right_pos = []                #    hints_right_pos is [ 2, 4, 7 ]
-        for h in reversed( hints ):         # . _ * _ * * _ * * *
-            right2 -= h
-            hints_right_pos.append( right2 )
-            right2 -= 1  # for the BLANK
-        hints_right_pos.reverse()
+        # the (inclusive) right possible pos for each hint is tails[k] back from the end
+        #    If right is 10 and hints is [ 1, 2, 3 ] tails is [ 8, 6, 3 ]
+        #    so hints_right_pos is [ 3, 5, 8 ]      . . . * _ * * _ * * *
+        hints_right_pos = [ right + 1 - t for t in plan[1] ]
         
-        # Start out in the left pos
+        block_masks     = [ ( 1 << h ) - 1 for h in hints ]
         ridx            = len( hints ) - 1  # index of last hint
-        idx             = ridx
-        hints_pos[-1]  -= 1                 # move the last one left one so we can increment it at the start
-        
-        # print( f"Left: {left} Right: {right} Hints: {hints} Max: {hints_right_pos}")
-        
+        hints_pos       = [ 0 ] * len( hints )
+        idx             = 0
+        pos             = left              # where we try to put hint idx next
+        gap             = 0                 # start of the gap before hint idx, nothing FILLED allowed in it
+
         while True:
-            hints_pos[idx] += 1             # move current index right
-            if hints_pos[idx] > hints_right_pos[idx]:
-                if idx == 0:                # We can't move the left hint any further right, stop
-                    return
-                idx -= 1
-                continue
-            if idx < ridx:                  # not on last hint?
-                while idx < ridx:           # move the next indexes to their next possible positions
-                    hints_pos[idx+1] = hints_pos[idx] + hints[idx] + 1  # next possible starting position
+            # slide hint idx right till it's not on top of a BLANK
+            #    but not past the first FILLED after the gap - that would leave it uncovered,
+            #    and further right is just worse
+            stop   = hints_right_pos[idx]
+            rest   = filled_bits >> gap
+            if rest:
+                first = gap + ( rest & -rest ).bit_length() - 1
+                if first < stop:
+                    stop = first
+            placed = False
+            while pos <= stop:
+                over = ( blank_bits >> pos ) & block_masks[idx]
+                if not over:
+                    placed = True
+                    break
+                pos += over.bit_length()    # jump past the rightmost BLANK we hit
+            
+            if placed:
+                hints_pos[idx] = pos
+                end = pos + hints[idx]      # one PAST the end
+                if idx < ridx:              # not on last hint? place the next one after a BLANK
                     idx += 1
-            yield hints_pos
+                    gap  = end
+                    pos  = end + 1
+                    continue
+                if not ( filled_bits >> end ):  # can't have any filled ones after we put all ours down
+                    yield hints_pos
+                pos += 1                    # then try the last hint one further right
+                continue
+
+            # hint idx has nowhere left to go, move the previous one right
+            if idx == 0:
+                return
+            idx -= 1
+            pos = hints_pos[idx] + 1
+            gap = hints_pos[idx-1] + hints[idx-1] if idx > 0 else 0
             
-    def get_slice_left_right_available( slice: numpy.array ) -> ( int, int, int ):
+    def smear_up( gen :int, pro :int ) -> int:
+        "Bitmask fill: keep adding bit i+1 while bit i is set and bit i+1 is in pro"
+        # Adding the seeds to pro ripples a carry up each run of pro from its lowest
+        # seed, clearing the bits it passes - so every run fills in the one add.
+        seeds = ( gen << 1 ) & pro
+        return gen | ( pro & ( ~( pro + seeds ) | seeds ) )
+
+    def smear_down( gen :int, pro :int ) -> int:
+        "Bitmask fill: keep adding bit i-1 while bit i is set and bit i-1 is in pro"
+        # Carries only run upwards, so this direction doubles the reach each pass instead.
+        #    FILLED cells split pro into separate runs, and once the reach is past the
+        #    longest one pro is empty - so it's log(longest run) passes, not log(width)
+        shift = 1
+        while pro:
+            gen |= pro & ( gen >> shift )
+            pro &= pro >> shift
+            shift <<= 1
+        return gen
+
+    def spread( bits :int, h :int, up :bool ) -> int:
+        "Every bit p becomes bits p..p+h-1 (up) or p-h+1..p (down)"
+        span = 1
+        while span * 2 <= h:
+            bits |= ( bits << span ) if up else ( bits >> span )
+            span *= 2
+        return bits | ( ( bits << ( h - span ) ) if up else ( bits >> ( h - span ) ) )
+
+    def simple_boxes( left :int, available :int, hints :list[int], plan :tuple ) -> ( int, int ):
+        """
+        What line_solve_bits() gives when nothing between left and left + available is set yet:
+            every placement is legal, so each hint can cover anything from packed all the way
+            left to slid all the way right, and always covers where those two overlap.
+        """
+        starts, tails = plan
+        slack    = available - tails[0]         # tails[0] is the room all the hints need
+        can_fill = 0
+        box      = 0
+        for h, start in zip( hints, starts ):
+            can_fill |= ( ( 1 << ( h + slack ) ) - 1 ) << start
+            if h > slack:
+                box  |= ( ( 1 << ( h - slack ) ) - 1 ) << ( start + slack )
+        return ( can_fill << left, ( ( ( 1 << available ) - 1 ) & ~box ) << left )
+
+    def line_solve_bits( left :int, right :int, hints :list[int], plan :tuple, filled_bits :int, blank_bits :int ) -> ( int, int ):
+        """
+        Which cells are FILLED in at least one legal position and which are left empty in at
+            least one (same positions get_legal_positions() gives), as ( can_fill, can_blank )
+            bitmasks of the whole slice.  Returns None if there are no legal positions.
+        Same left/right DP as tally_legal_positions() but only whether there's a way, not how
+            many, so each step works on every cell at once as one bitmask:
+          reach_left[k]  bit i: the first k hints fit in cells [0,i)
+          reach_right[k] bit i: hints k.. fit in cells [i,w)
+        That's O(hints * log(width)) int operations for the whole line.
+        """
+        w       = right + 1 - left              # work only on left..right, everything outside is BLANK
+        full    = ( 1 << w ) - 1
+        blank   = ( blank_bits >> left ) & full
+        free    = full & ~( filled_bits >> left )   # cells that may be left empty
+        n       = len( hints )
+        starts, tails = plan
+
+        # fits[k] bit p: hint k at p doesn't cover a BLANK
+        fits    = []
+        for k in range( n ):
+            lo, hi = starts[k], w - tails[k]
+            fits.append( ( ( 1 << ( hi + 1 ) ) - ( 1 << lo ) ) & ~Board.spread( blank, hints[k], False ) )
+
+        # just the one hint?  No DP needed, it has to start where it fits and covers every FILLED
+        if n == 1:
+            h, can = hints[0], fits[0]
+            filled = full & ~free
+            if filled:
+                lo   = ( filled & -filled ).bit_length() - 1    # start no later than the first FILLED
+                hi   = max( filled.bit_length() - h, 0 )        #    and no earlier than h - 1 before the last
+                can &= ( ( 2 << lo ) - ( 1 << hi ) ) if hi <= lo else 0     # FILLED too far apart
+            if not can:
+                return None
+            first, last = ( can & -can ).bit_length() - 1, can.bit_length() - 1
+            always      = ( ( 1 << ( first + h ) ) - ( 1 << last ) ) if last < first + h else 0   # covered by every start
+            return ( Board.spread( can, h, True ) << left, ( free & ~always ) << left )
+
+        # left to right - a hint can start after a gap once the ones before it fit
+        reach_left  = [ Board.smear_up( 1, free << 1 ) ]
+        enters      = []
+        for k in range( n ):
+            reach   = reach_left[k]
+            enter   = ( ( reach & 1 ) | ( ( reach & free ) << 1 ) ) & fits[k]
+            enters.append( enter )
+            reach_left.append( Board.smear_up( enter << hints[k], free << 1 ) )
+        if not ( reach_left[n] >> w ) & 1:
+            return None                         # no legal positions at all
+
+        # right to left - a hint can end before a gap if the ones after it fit
+        reach_right = [ 0 ] * n + [ Board.smear_down( 1 << w, free ) ]
+        can_fill    = 0
+        for k in range( n - 1, -1, -1 ):
+            reach   = reach_right[k+1]
+            exit    = ( ( ( reach & ( 1 << w ) ) | ( ( reach >> 1 ) & free ) ) >> hints[k] ) & fits[k]
+            reach_right[k] = Board.smear_down( exit, free )
+            can_fill |= Board.spread( enters[k] & exit, hints[k], True )  # every start that works both ways
+
+        # a cell can be empty if the hints before it fit on its left and the rest on its right
+        can_blank   = 0
+        for k in range( n + 1 ):
+            can_blank |= reach_left[k] & ( reach_right[k] >> 1 )
+        can_blank  &= free
+
+        return ( can_fill << left, can_blank << left )
+
+    def apply_line( slice :numpy.array, can_fill :int, can_blank :int, bits :tuple ) -> ( list[int], bool, tuple ):
+        """
+        Set every UNKNOWN cell that can only go one way (per the can_fill / can_blank bitmasks,
+            like line_solve_bits() gives) in slice.  bits is slice_bits( slice ) before.
+        Returns ( changed_indexes[], done, bits after ) - done if nothing could still go either way.
+        """
+        filled_bits, blank_bits = bits
+        unknown     = ( ( 1 << len( slice ) ) - 1 ) & ~( filled_bits | blank_bits )
+        new_filled  = unknown & ~can_blank
+        new_blank   = unknown & ~can_fill
+        to_fill     = Board.bit_indexes( new_filled )
+        to_blank    = Board.bit_indexes( new_blank )
+        # a fancy-index write costs as much with no indexes as with a few, so skip the empty ones
+        if to_fill:
+            slice[to_fill]  = Board.FILLED
+        if to_blank:
+            slice[to_blank] = Board.BLANK
+        done        = not ( unknown & can_fill & can_blank )    # nothing left that could go either way
+        bits        = ( filled_bits | new_filled, blank_bits | new_blank )  # no need to pack slice again
+        changed     = Board.bit_indexes( new_filled | new_blank ) if to_fill and to_blank else to_fill or to_blank
+        return ( changed, done, bits )
+
+    def runs_match( filled_bits :int, hints :list[int] ) -> bool:
+        "True if the runs of set bits in filled_bits are exactly hints, in order - the line is finished"
+        for h in hints:
+            if not filled_bits:
+                return False
+            low  = filled_bits & -filled_bits
+            end  = ( filled_bits + low ) & ~filled_bits     # the carry stops one past this run
+            if end.bit_length() - low.bit_length() != h:
+                return False
+            filled_bits &= -end                             # drop this run
+        return not filled_bits
+
+    def bit_indexes( bits :int ) -> list[int]:
+        "Indexes of the set bits, lowest first"
+        idxs = []
+        while bits:
+            low = bits & -bits
+            idxs.append( low.bit_length() - 1 )
+            bits ^= low
+        return idxs
+
+    def tally_legal_positions( left :int, right :int, hints :list[int], plan :tuple, filled_bits :int, blank_bits :int, fill_diff :list[int] ) -> int:
+        """
+        Adds every legal position (same ones get_legal_positions() would give) into fill_diff
+            (+1 at block start, -1 one past its end), returns how many legal positions there were.
+        Doesn't actually walk the positions - counts them with a left/right DP instead:
+          ways_left[k][i]  = ways to fit the first k hints into cells [0,i)
+          ways_right[k][i] = ways to fit hints k.. into cells [i,w)
+            (legally: no block on a BLANK, no FILLED left uncovered)
+          so hint k starting at p appears in ways_left[k][p-1] * ways_right[k+1][end+1] positions.
+        That's O(width * hints) no matter how many positions there are.
+        plan is the row/col's ( starts, tails ) from config, only starts in between are tried.
+        """
+        # work only on left..right, everything outside is BLANK anyway
+        w           = right + 1 - left
+        blank       = blank_bits >> left
+        filled      = filled_bits >> left
+        is_filled   = [ c == '1' for c in bin( filled )[:1:-1].ljust( w, '0' ) ]   # low bit first, one string walk
+        n           = len( hints )
+        starts, tails = plan
+        fits        = []                        # fits[k][p]: hint k could sit at p
+        for k in range( n ):
+            h, mask = hints[k], ( 1 << hints[k] ) - 1
+            fit     = [ False ] * ( w - h + 1 )
+            for p in range( starts[k], w - tails[k] + 1 ):
+                fit[p] = not ( blank >> p ) & mask
+            fits.append( fit )
+
+        # The plan bounds both tables too:  the first k hints can't end before
+        #    starts[k-1] + hints[k-1] so ways_left[k] is 0 below that, and nothing reads it
+        #    past where hint k has to start (w - tails[k]).  ways_right mirrors that.
+        ways_left   = [ [ 0 ] * ( w + 1 ) for k in range( n + 1 ) ]
+        ways        = ways_left[0]
+        ways[0]     = 1
+        for i in range( 1, w - tails[0] ):      # no hints, so no FILLED allowed
+            ways[i] = 0 if is_filled[i-1] else ways[i-1]
+        for k in range( 1, n + 1 ):
+            h, fit, prev, ways = hints[k-1], fits[k-1], ways_left[k-1], ways_left[k]
+            for i in range( starts[k-1] + h, w - tails[k] if k < n else w + 1 ):
+                c = 0 if is_filled[i-1] else ways[i-1]  # cell i-1 left empty
+                p = i - h                               # or hint k-1 ends at i-1
+                if fit[p]:
+                    if p == 0:
+                        c += prev[0]
+                    elif not is_filled[p-1]:            # needs a gap before it
+                        c += prev[p-1]
+                ways[i] = c
+
+        ways_right  = [ [ 0 ] * ( w + 1 ) for k in range( n + 1 ) ]
+        ways        = ways_right[n]
+        ways[w]     = 1
+        for i in range( w - 1, -1, -1 ):
+            ways[i] = 0 if is_filled[i] else ways[i+1]
+        for k in range( n - 1, 0, -1 ):         # ways_right[0] is never read
+            h, fit, nxt, ways = hints[k], fits[k], ways_right[k+1], ways_right[k]
+            for i in range( w - tails[k], starts[k-1] + hints[k-1], -1 ):
+                c = 0 if is_filled[i] else ways[i+1]    # cell i left empty
+                if fit[i]:                              # or hint k starts at i
+                    e = i + h
+                    if e == w:
+                        c += nxt[w]
+                    elif not is_filled[e]:              # needs a gap after it
+                        c += nxt[e+1]
+                ways[i] = c
+
+        # now every hint at every start it can legally have
+        for k in range( n ):
+            h, fit, before, after = hints[k], fits[k], ways_left[k], ways_right[k+1]
+            for p in range( starts[k], w - tails[k] + 1 ):
+                if not fit[p]:
+                    continue
+                if p == 0:
+                    a = before[0]
+                elif is_filled[p-1]:
+                    continue
+                else:
+                    a = before[p-1]
+                if not a:
+                    continue
+                e = p + h
+                if e == w:
+                    b = after[w]
+                elif is_filled[e]:
+                    continue
+                else:
+                    b = after[e+1]
+                if b:
+                    fill_diff[left+p]   += a * b
+                    fill_diff[left+e]   -= a * b
+
+        return ways_left[n][w]
+
+    def nth_legal_position( left :int, right :int, hints :list[int], plan :tuple, filled_bits :int, blank_bits :int, nth :int ) -> list[int]:
+        """
+        The nth (from 0) position get_legal_positions() would give, without walking the ones before it.
+        ways_right[k][i] from tally_legal_positions() is how many ways hints k.. finish from cell i,
+            so each start tried for a hint can skip every position it leads to at once, till
+            nth lands inside one.  Returns None if there are nth or fewer positions.
+        """
+        w           = right + 1 - left
+        blank       = blank_bits >> left
+        filled      = filled_bits >> left
+        n           = len( hints )
+        starts, tails = plan
+
+        ways_right  = [ [ 0 ] * ( w + 1 ) for k in range( n + 1 ) ]
+        ways        = ways_right[n]
+        ways[w]     = 1
+        for i in range( w - 1, -1, -1 ):
+            ways[i] = 0 if ( filled >> i ) & 1 else ways[i+1]
+        for k in range( n - 1, 0, -1 ):
+            h, mask, nxt, ways = hints[k], ( 1 << hints[k] ) - 1, ways_right[k+1], ways_right[k]
+            for i in range( w - tails[k], starts[k] - 1, -1 ):
+                c = 0 if ( filled >> i ) & 1 else ways[i+1]
+                if not ( blank >> i ) & mask:
+                    e = i + h
+                    if e == w:
+                        c += nxt[w]
+                    elif not ( filled >> e ) & 1:
+                        c += nxt[e+1]
+                ways[i] = c
+
+        fill_pos    = []
+        gap         = 0                         # start of the gap before hint k
+        for k in range( n ):
+            h, mask, after = hints[k], ( 1 << hints[k] ) - 1, ways_right[k+1]
+            p = max( starts[k], gap + 1 if k else 0 )
+            while True:
+                if p > w - tails[k] or ( filled >> gap ) & ( ( 1 << ( p - gap ) ) - 1 ):
+                    return None                 # out of room, or a FILLED left uncovered
+                if not ( blank >> p ) & mask:
+                    e = p + h
+                    if e == w:
+                        count = after[w]
+                    else:
+                        count = 0 if ( filled >> e ) & 1 else after[e+1]
+                    if nth < count:
+                        break
+                    nth -= count
+                p += 1
+            fill_pos.append( left + p )
+            gap = p + h
+        return fill_pos
+
+    def fill_pattern( hints :list[int], hints_key :tuple ) -> ( numpy.array, int ):
+        """
+        The cells for hints packed as tight as they go, as a read-only uint8 array:
+            [ 2, 1 ] is FILLED FILLED BLANK FILLED.  Worked out once per hints.
+        Returns ( cells, filled_bits ) - filled_bits is slice_bits( cells )[0]
+        """
+        pattern = Board.fill_patterns.get( hints_key )
+        if pattern is None:
+            cells   = numpy.frombuffer( Board.BLANK_BYTE.join( Board.FILLED_BYTE * h for h in hints ), numpy.uint8 )
+            pattern = ( cells, Board.slice_bits( cells )[0] )
+            Board.fill_patterns[ hints_key ] = pattern
+        return pattern
+
+    def placement_table( hints :list[int], plan :tuple, hints_key :tuple, width :int ) -> numpy.array:
+        """
+        Every position hints can take in an empty line width wide, as a uint64 array with
+            the FILLED bits of one position each.  Worked out once per hints and width, the
+            first time they ask.  None if there are more than PLACEMENTS_MAX positions,
+            or the line doesn't fit in 64 bits.
+        Counting the positions that fit a slice is then a couple of ANDs over the whole
+            array - a few times quicker than tally_legal_positions() while it's this short.
+        """
+        key   = ( hints_key, width )
+        table = Board.placements.get( key, False )
+        if table is not False:
+            return table
+        
+        table = None
+        n     = len( hints )
+        slack = width - ( sum( hints ) + n - 1 )
+        if width <= 64 and math.comb( slack + n, n ) <= Board.PLACEMENTS_MAX:
+            # From the last hint back: rest is every position of the hints after this one,
+            #    in order of where the next one starts, and rest[ rest_at[p]: ] is the ones
+            #    where it starts at p or later - a view, so nothing gets copied but the new level
+            ( starts, tails ) = plan
+            rest    = numpy.zeros( 1, numpy.uint64 )      # past the last hint - just nothing
+            rest_at = [ 0 ] * ( width + 2 )
+            for k in range( n - 1, -1, -1 ):
+                h, parts, at, size = hints[k], [], [ 0 ] * ( width + 2 ), 0
+                for p in range( starts[k], width - tails[k] + 1 ):
+                    at[p]  = size
+                    part   = rest[ rest_at[ p + h + 1 ]: ] | numpy.uint64( ( ( 1 << h ) - 1 ) << p )
+                    size  += len( part )
+                    parts.append( part )
+                for p in range( width - tails[k] + 1, width + 2 ):
+                    at[p]  = size                           # nothing starts that late
+                rest, rest_at = numpy.concatenate( parts ), at
+            table = rest
+        Board.placements[ key ] = table
+        return table
+
+    def fitting_placements( table :numpy.array, filled_bits :int, blank_bits :int ) -> numpy.array:
+        """
+        The positions in placement_table() table that fit a slice, in the same order.
+        A position fits if it covers every FILLED and no BLANK - one AND and compare.
         """
-        Count from the edges till we find a non-forced blank cell.
+        return table[ ( table & numpy.uint64( filled_bits | blank_bits ) ) == numpy.uint64( filled_bits ) ]
+
+    def set_cells( slice :numpy.array, cells :bytes, start :int = 0 ) -> list[int]:
+        """
+        Write cells (one byte per cell, like slice.tobytes()) over slice, starting at start.
+        Returns the list of indexes (into the whole slice) that actually changed.
+        """
+        new     = numpy.frombuffer( cells, numpy.uint8 )
+        dest    = slice[start:start+len( new )]
+        changed = numpy.flatnonzero( dest != new )
+        dest[:] = new                   # one memcpy
+        if start:
+            changed += start
+        return changed.tolist()
+
+    def bits_left_right_available( blank_bits :int, full_width :int ) -> ( int, int, int ):
+        """
+        Find the first and last non-BLANK cells from the slice's BLANK bitmask.
         Blank cells at the edge are basically forbidden territory, we can 'ignore' them.
         Returns (left, right, available)
         """
-        full_width = len(slice)        
+        if not blank_bits:              # no BLANKs at all (every line starts this way) - the whole width
+            return( 0, full_width - 1, full_width )
+        nonblank = ~blank_bits & ( ( 1 << full_width ) - 1 )
+        if not nonblank:                # all BLANK, nothing available
+            return( full_width, full_width - 1, 0 )
+        left  = ( nonblank & -nonblank ).bit_length() - 1   # lowest set bit
+        right = nonblank.bit_length() - 1
+        return( left, right, right - left + 1 )
+
+    def slice_bits( slice: numpy.array ) -> ( int, int ):
+        """
+        Pack a slice into two bitmasks, bit x set if cell x is FILLED / BLANK.
+        Python ints so any width works. Returns (filled_bits, blank_bits)
+        """
+        filled = int.from_bytes( numpy.packbits( slice == Board.FILLED, bitorder='little' ).tobytes(), 'little' )
+        blank  = int.from_bytes( numpy.packbits( slice == Board.BLANK,  bitorder='little' ).tobytes(), 'little' )
+        return ( filled, blank )
 
-        left, right  = 0, full_width - 1
-        while( left < full_width and slice[left] == Board.BLANK ):
-            left += 1
-        while( right > left and slice[right] == Board.BLANK ):
-            right -= 1
-        available = right - left + 1
-        return( left, right, available )
+    def lines_bits( lines: numpy.array ) -> list[ ( int, int ) ]:
+        """
+        slice_bits() for every row of a 2D array (grid for rows, grid_T for cols) in one go,
+            one packbits per cell state for the whole thing instead of two per line.
+        """
+        nbytes  = ( lines.shape[1] + 7 ) // 8
+        filled  = numpy.packbits( lines == Board.FILLED, axis=1, bitorder='little' ).tobytes()
+        blank   = numpy.packbits( lines == Board.BLANK,  axis=1, bitorder='little' ).tobytes()
+        return [ ( int.from_bytes( filled[i:i+nbytes], 'little' ), int.from_bytes( blank[i:i+nbytes], 'little' ) )
+                 for i in range( 0, len( filled ), nbytes ) ]
 
     #
     # return/output printable copy
@@ -167,6 +683,8 @@ class Board:
     UNKNOWN_STR, UNKNOWN_STR_ANSI, FILLED_STR, FILLED_STR_ANSI, BLANK_STR, BLANK_STR_ANSI = "","","","","",""
     cell_strs       = []
     cell_strs_ansi  = []
+    cell_strs_np        = None      # cell_strs as fixed width '<U2', so the whole grid's text is one take()
+    cell_strs_ansi_np   = None      # cell_strs_ansi as an object array (they're not all one length)
     
     def set_output_chars( args: argparse.Namespace ):
         Board.UNKNOWN_STR         = args.unknown_char[0] + " "
@@ -177,6 +695,8 @@ class Board:
         Board.BLANK_STR_ANSI      = Board.BLANK_STR
         Board.cell_strs           = [ Board.UNKNOWN_STR, Board.FILLED_STR, Board.BLANK_STR ]
         Board.cell_strs_ansi      = [ Board.UNKNOWN_STR_ANSI, Board.FILLED_STR_ANSI, Board.BLANK_STR_ANSI ]
+        Board.cell_strs_np        = numpy.array( Board.cell_strs, dtype='<U2' )
+        Board.cell_strs_ansi_np   = numpy.array( Board.cell_strs_ansi, dtype=object )
 
     def printable( self, console:bool ) -> list[str]:
         """ 
@@ -193,51 +713,63 @@ class Board:
         step_str = f"{self.step:>4}"
         step_len = len( step_str )  # before we add ANSI
         if console:
-            step_str = Fore.CYAN + step_str + Style.RESET_ALL
+            step_str = STEP_ANSI + step_str + RESET_ANSI
         lines[0] = step_str + lines[0][step_len:]
 
-        # decide to use ANSI strings (for console) or non-ANSI (for file)
-        strs = Board.cell_strs_ansi if console else Board.cell_strs
-        # for each row
-        for y in range( config.rown ):
-            # start a new line with the row header
-            line = [ config.row_hdrs[y] ]
-            # for each col
-            for x in range( config.coln ):
-                # add the cell state
-                line.append( strs[ self.grid[y,x] ])
-            # then join all the cells for the final line
-            lines.append(  "".join( line ) )
+        # the ANSI strings (for console) are different lengths, so look up every cell's
+        #    string at once and join them a row at a time
+        if console:
+            cells = Board.cell_strs_ansi_np[ self.grid ].tolist()
+            for y in range( config.rown ):
+                # the row header then all the cells for the final line
+                lines.append( config.row_hdrs[y] + "".join( cells[y] ) )
+        # the plain ones (for file) are all 2 chars, so the whole grid is one string to cut up
+        else:
+            text  = Board.cell_strs_np.take( self.grid ).tobytes().decode( "utf-32-le" )
+            width = 2 * config.coln
+            for y in range( config.rown ):
+                lines.append( config.row_hdrs[y] + text[ y*width : y*width + width ] )
         lines.append( "" )    # and a blank
         return lines
 
+    def print_to( self, stream, console :bool = True ) -> None:
+        """
+        Write the board to stream, with ANSI colours if console.
+        It goes as one joined string - a write per line takes about four times as long.
+        """
+        text = "\n".join( self.printable( console ) )
+        stream.write( text + "\n" if console else text )
+
     def output_grid( self ) -> None:
+        "Print the board to console and outfile as asked for - renders nothing if neither wants it"
         if not config.args.quiet:
-            lines = board.printable( console=True )
-            print( "\n".join( lines ) )
+            self.print_to( sys.stdout, console=True )
         if config.outfile:
-            lines = board.printable( console=False )
-            config.outfile.write( "\n".join( lines ) )
+            self.print_to( config.outfile, console=False )
             
 
     #
     # Board solving
     #
     
-    def recursive_solve( self, slice :numpy.array, hints :list[int], rowcol :str, available :int, left: int, right: int, force :int ) -> ( list[int], int ):
+    def recursive_solve( self, slice :numpy.array, hints :list[int], hints_total :int, hints_max :int, plan :tuple, hints_key :tuple, rowcol :str, available :int, left: int, right: int, force :int, bits :tuple ) -> ( list[int], int, bool, tuple ):
         """
         This runs through all given options for a slice, then looks at
              where things overlapped. May modify slice directly.
-        Not technically recursive since get_all_positions is a generator,
-            just looks at every possible position.
+        Not technically recursive since get_legal_positions is a generator,
+            just looks at every legal position - and normally not even that, the
+            counts come from the DP in tally_legal_positions().
         
         Don't call this directly in most cases, called by solve_slice() with same parms.
           left, right:  outermost non-BLANK position (where we have to start worrying)
           available = right - left : available width, ignoring BLANKs on edges
           force: If >= 0 force that possible move in --foprce mode
+          bits:  slice_bits( slice )
           
-        Returns ( changed_cell_indexes[], possible_moves )
+        Returns ( changed_cell_indexes[], possible_moves, done, bits )
            possible_moves is invalid if force was >= 0 because we stopped at that combination
+           done is True if no UNKNOWN cells are left in the slice
+           bits is slice_bits( slice ) after the changes
         """
         
         #
@@ -254,433 +786,503 @@ class Board:
         #          _ _ _ * _    so the rest must be BLANK and the row is done
 
         # if slice is all unknowns (0) and the hints are too short don't even bother trying.
-        # Say the slice is 10 long and the hints are '1 2' then hints_width is 4,
+        # Say the slice is 10 long and the hints are '1 2' then hints_total is 4,
         #    and 10 - 4 = 6 which is way longer than 1 or 2, so not worth it.
-        # If the slice is 10 long and the hints are '1 2 3' then hints_width is 8,
+        # If the slice is 10 long and the hints are '1 2 3' then hints_total is 8,
         #    10 - 8 = 2, so it's worth it because we'll get overlap on the 3.
-        if not slice.any():  # all UNKNOWN
-            hints_width = sum( hints ) + len( hints ) - 1  # sum(n) + (n-1) spaces
-            hints_max = max( hints )
-            if ( available - hints_width ) >= hints_max:
-                return ( [], 99 )  # 99 = lots of possible moves
+        # bitmasks of the slice so checking a position is a couple of ANDs
+        filled_bits, blank_bits = bits
+        verbose = config.args.verbose       # checked all through here, look it up once
+
+        if force < 0 and not ( filled_bits | blank_bits ):  # all UNKNOWN (and not being forced)
+            if ( available - hints_total ) >= hints_max:
+                # nothing to find, but pick_guess() goes by the count - and an empty line's
+                #    positions are just the ways to share the slack out among the gaps
+                n = len( hints )
+                return ( [], min( math.comb( available - hints_total + n, n ), Board.MOVES_MAX ), False, bits )
             
 
-        # count how many FILLED we have at each cell for every combination
-        fill_count  = numpy.zeros( len(slice), dtype=numpy.uint32 )
+        # Not forcing, tracing, or in --force mode (which wants row_moves / col_moves counted)?
+        #    Then all we need is which cells can go which way, and that's just bitmasks
+        if force < 0 and verbose < VERBOSE_MORE and not config.args.force:
+            if not filled_bits and not ( blank_bits >> left ) & ( ( 1 << available ) - 1 ):
+                can = Board.simple_boxes( left, available, hints, plan )    # nothing in the way, no DP needed
+            else:
+                can = Board.line_solve_bits( left, right, hints, plan, filled_bits, blank_bits )
+            if not can:
+                raise SolveError( f"* Step {self.step:>4} {rowcol} - hints ({list( hints )}) - no possible solutions!" )
+            ( changed, done, bits ) = Board.apply_line( slice, can[0], can[1], bits )
+            return ( changed, 0, done, bits )       # 0 = moves weren't counted
 
-        # Iterate over the possible positions
-        pos_count = 0
-        for fill_pos in Board.get_all_positions( left, right, hints ):
+        width   = len( slice )
+        full    = ( 1 << width ) - 1    # every cell of the line
 
-            if config.args.verbose >= VERBOSE_MORE:
-                output(  f"  Step {self.step:>4} - {rowcol} - {left} {right} {hints} -  {pos_count} {fill_pos}")
-           
-            # Check if this position is possible
-            #    iterate through each block and see if it's not illegal
-            okay = True
-            end  = 0
-            for x in range( len(hints) ):
-                pos, size = fill_pos[x], hints[x]
-                if pos > end and numpy.any( slice[end:pos] == Board.FILLED ): # can't have any FILLED in before this
-                    okay = False
-                    break
-                end  = pos + size  # one PAST the end
-                if numpy.any( slice[pos:end] == Board.BLANK ):   # can't be on top of any be blank areas
-                    okay = False
-                    break
-            if not okay:
-                continue
-            if end <= right and numpy.any( slice[end:] == Board.FILLED ):     # can't have any filled ones after we put all ours down
-                continue
+        # If the hints don't have many positions, just check every one of them at once
+        fits = None
+        if verbose < VERBOSE_MORE:
+            table = Board.placement_table( hints, plan, hints_key, width )
+            if table is not None:
+                fits = Board.fitting_placements( table, filled_bits, blank_bits )
+
+        # Forcing but not tracing?  Then go straight to that position, no walking the ones before it
+        if force >= 0 and verbose < VERBOSE_MORE:
+            if fits is not None:
+                if force < len( fits ):
+                    mask = int( fits[force] )
+                    return self.force_position( slice, hints, Board.bit_indexes( mask & ~( mask << 1 ) ), force, bits )  # where each block starts
+            else:
+                fill_pos = Board.nth_legal_position( left, right, hints, plan, filled_bits, blank_bits, force )
+                if fill_pos:
+                    return self.force_position( slice, hints, fill_pos, force, bits )
+            # fewer positions than force, so just count them like normal
+
+        # Nothing to trace?  Then the DP counts everything without walking positions
+        if verbose < VERBOSE_MORE:
+            if fits is not None:
+                if not len( fits ):
+                    raise SolveError( f"* Step {self.step:>4} {rowcol} - hints ({list( hints )}) - no possible solutions!" )
+                can_fill  = int( numpy.bitwise_or.reduce( fits ) )      # FILLED somewhere
+                can_blank = ~int( numpy.bitwise_and.reduce( fits ) ) & full  # not FILLED everywhere
+                ( changed, done, bits ) = Board.apply_line( slice, can_fill, can_blank, bits )
+                return ( changed, len( fits ), done, bits )
+            # count how many FILLED we have at each cell for every combination
+            #    kept as a difference array: +1 where a block starts, -1 one past its end,
+            #    and the running sum at the end gives the count per cell
+            fill_diff = [ 0 ] * ( width + 1 )
+            pos_count = Board.tally_legal_positions( left, right, hints, plan, filled_bits, blank_bits, fill_diff )
 
-            #
-            # force this position if requested
-            #
-            if pos_count == force:
-                if config.args.verbose >= VERBOSE_SOME:
-                    output( f"FORCING! {hints} {fill_pos} {slice[0:fill_pos[0]]}" )
-                changed = []
-                for x in range( len( hints ) ):
-                    pos, size = fill_pos[x], hints[x]
-                    end  = pos + size                   # one PAST the end
-                    for x in range( pos, end ):
-                        if slice[x] == Board.UNKNOWN:
-                            slice[x] = Board.FILLED
-                            changed.append(x)
-                for x in range( left, right ):
-                    if slice[x] == Board.UNKNOWN:
-                        slice[x] = Board.BLANK
-                        changed.append(x)
-                return ( changed, pos_count )           # pos_count is invalid
+            # Now look for any previously UNKNOWN cells and see if they were always 
+            #     BLANK or FILLED in our simulation.  If none are left UNKNOWN then
+            #     every legal position agreed on every cell and the line is done.
+            # The running sum of fill_diff is how many positions fill each cell, turned straight
+            #     into bitmasks - plain ints, since the counts can be way past what int64 holds
+            can_fill    = 0
+            can_blank   = 0
+            bit         = 1
+            for fill_count in itertools.accumulate( fill_diff[:-1] ):
+                if fill_count:
+                    can_fill  |= bit
+                if fill_count != pos_count:
+                    can_blank |= bit
+                bit <<= 1
+        else:
+            # Iterate over the legal positions - a cell can be FILLED if any of them fills it,
+            #    and BLANK unless all of them do.  fill_diff only gets kept up for -vvvvv to show.
+            pos_count = 0
+            can_fill  = 0
+            always    = full
+            fill_diff = [ 0 ] * ( width + 1 )
+            for fill_pos in Board.get_legal_positions( left, right, hints, plan, filled_bits, blank_bits ):
+
+                output(  f"  Step {self.step:>4} - {rowcol} - {left} {right} {list( hints )} -  {pos_count} {fill_pos}")
+
+                #
+                # force this position if requested
+                #
+                if pos_count == force:
+                    return self.force_position( slice, hints, fill_pos, force, bits )
                 
 
-            # count the number of legal positions
-            pos_count += 1
+                # count the number of legal positions
+                pos_count += 1
 
-            # mark the filled cells in fill_count
-            for x in range( len(hints ) ):
-                pos, size = fill_pos[x], hints[x]
-                end  = pos + size                   # one PAST the end
-                for x in range( pos, end ):
-                    fill_count[x] += 1              # each filled in square
+                # and the cells this one fills
+                mask = 0
+                for x in range( len(hints ) ):
+                    mask |= ( ( 1 << hints[x] ) - 1 ) << fill_pos[x]
+                can_fill |= mask
+                always   &= mask
                     
-            if config.args.verbose >= VERBOSE_ALL:
-                output( f"       {pos_count}  fill: {fill_count}")
+                if verbose >= VERBOSE_ALL:
+                    for x in range( len(hints ) ):
+                        pos = fill_pos[x]
+                        fill_diff[pos]          += 1
+                        fill_diff[pos+hints[x]] -= 1
+                    output( f"       {pos_count}  fill: {numpy.cumsum( fill_diff[:-1] )}")
+            can_blank = ~always & full
 
         if pos_count == 0:
-            raise SolveError( f"* Step {self.step:>4} {rowcol} - hints ({hints}) - no possible solutions!" )
-
-        # Now look for any previously UNKNOWN cells and see if they were always 
-        #     BLANK or FILLED in our simulation
-        changed = []
-        for x in range( len( slice ) ):
-            if slice[x] == Board.UNKNOWN:
-                if fill_count[x] == pos_count:
-                    slice[x] = Board.FILLED
-                    changed.append(x)
-                elif fill_count[x] == 0:
-                    slice[x] = Board.BLANK
-                    changed.append(x)
+            raise SolveError( f"* Step {self.step:>4} {rowcol} - hints ({list( hints )}) - no possible solutions!" )
+
+        ( changed, done, bits ) = Board.apply_line( slice, can_fill, can_blank, bits )
             
-        return ( changed, pos_count )
+        return ( changed, min( pos_count, Board.MOVES_MAX ), done, bits )
+
+
+    def force_position( self, slice :numpy.array, hints :list[int], fill_pos :list[int], force :int, bits :tuple ) -> ( list[int], int, bool, tuple ):
+        """
+        Write legal position fill_pos (from get_legal_positions() or nth_legal_position())
+            into slice, everything not in a block BLANK.  Returns what recursive_solve() does.
+        bits is slice_bits( slice ) before.
+        """
+        if config.args.verbose >= VERBOSE_SOME:
+            output( f"FORCING! {list( hints )} {fill_pos} {slice[0:fill_pos[0]]}" )
+        # legal, so the blocks only go over UNKNOWN / FILLED and cover every FILLED -
+        #    it's just a line where each cell can only go one way
+        mask = 0
+        for x in range( len( hints ) ):
+            mask |= ( ( 1 << hints[x] ) - 1 ) << fill_pos[x]
+        ( changed, done, bits ) = Board.apply_line( slice, mask, ~mask, bits )
+        return ( changed, force, True, bits )     # possible moves is invalid
+
+    def cache_slice( key :tuple, value :tuple ) -> None:
+        """Remember solve_slice()'s answer for key, dropping the least recently used if full."""
+        if len( Board.slice_cache ) >= Board.SLICE_CACHE_MAX:
+            del Board.slice_cache[ next( iter( Board.slice_cache ) ) ]
+        Board.slice_cache[ key ] = value
 
 
-    def solve_slice( self, slice :numpy.array, hints :list[int], rowcol :str, force :int ) -> ( list[int], int, bool ):
+    def solve_slice( self, slice :numpy.array, hints :list[int], hints_total :int, hints_max :int, plan :tuple, hints_key :tuple, rowcol :str, force :int, bits :tuple = None ) -> ( list[int], int, bool, tuple ):
         """
         Try to knock out items in a row or column, we don't care which one. 
         
         Caller has already checked if row_done or col_done to see if we don't need to check this.
         
+        hints_total, hints_max, plan, hints_key are precomputed per row/col in config (rows_total, rows_max, rows_plan, rows_key, etc)
+        
         If force >= 0 brute force that solution
+        bits is slice_bits( slice ) if the caller already worked it out (solve_next does a whole pass at once)
         
-        Returns ( changed_indexes[], valid_moves, done )
+        Returns ( changed_indexes[], valid_moves, done, bits )
+           done is True exactly when no UNKNOWN cells are left, so callers never have to look
+           bits is slice_bits( slice ) after the changes, worked out from what changed
         """
         
         full_width = len(slice)
 
         #
-        # rule 'zero' - 0 length means we're done
+        # rule 'zero' (no hints) and rule 'one' (hints that fill the width) were already
+        #    done by Board.blank() - the first are always solved, the second fit exactly below
         #
-        if not hints:
-            slice.fill( Board.BLANK )
-            if config.args.verbose >= VERBOSE_SOME:
-                output(  f"- Step {self.step:>4} {rowcol} - 0 length fill BLANK" )
-            # this only triggers on the first time, so just assume every cell changed
-            return ( [ x for x in range(full_width) ], 0, True )
-        # rule 'one' - 1 hint, full width - trivial
-        #
-        if len(hints) == 1 and hints[0] == full_width:
-            slice.fill( Board.FILLED )
-            if config.args.verbose >= VERBOSE_SOME:
-                output(  f"- Step {self.step:>4} {rowcol} - {hints} FILLED" )
-            # this only triggers on the first time, so just assume every cell changed
-            return ( [ x for x in range(full_width) ], 0, True )
-        
-        left, right, available = Board.get_slice_left_right_available( slice )
-        if available == 0:  # should not get here, but handle it as a done row
-            return( [], 0, True )
+        if not bits:
+            bits = Board.slice_bits( slice )
+        verbose = config.args.verbose       # checked all through here, look it up once
+
+        # Seen this exact slice with these hints before?  Then just replay the answer.
+        #    The bits already say exactly what's in the slice, so they're the key.
+        #    In --force most lines come from here, so it's the first thing to try.
+        key = None
+        if force < 0:
+            key    = ( hints_key, full_width ) + bits
+            cached = Board.slice_cache.pop( key, None )
+            if cached is not None:
+                Board.slice_cache[ key ] = cached       # now the most recently used
+                if not cached:
+                    raise SolveError( f"* Step {self.step:>4} {rowcol} - hints ({list( hints )}) - no possible solutions!" )
+                ( new_cells, changed_idxs, valid_moves, done, bits ) = cached
+                if new_cells is not None:       # None if solving it didn't change anything
+                    numpy.copyto( slice, new_cells )
+                if verbose >= VERBOSE_MORE:
+                    output(  f"  Step {self.step:>4} - {rowcol} - {list( hints )} - cached" )
+                if done and verbose >= VERBOSE_SOME:
+                    output(  f"- Step {self.step:>4} - {rowcol} - done" )
+                return ( changed_idxs, valid_moves, done, bits )    # callers only read it, the tuple will do
+
+        left, right, available = Board.bits_left_right_available( bits[1], full_width )
         
-        hints_total = sum( hints ) + len( hints ) - 1
+        # read_config_file() already made sure the hints fit the full width, so this only
+        #    happens when BLANKs have closed in on them (including all BLANK) - a dead board
         if hints_total > available:
-            # print( f"Hints ({hints_len}) are larger than available space ({available})" )
-            raise SolveError( f"* Step {self.step:>4} {rowcol} - hints ({hints}) are larger than available space ({available})" )
+            raise SolveError( f"* Step {self.step:>4} {rowcol} - hints ({list( hints )}) are larger than available space ({available})" )
         if hints_total == available:  # the whole line is filled, hooray!
-            changed = []            # this can kick in later as left and right move in, look for actual changes
-            if config.args.verbose >= VERBOSE_SOME:
-                output(  f"- Step {self.step:>4} {rowcol} - {hints} fills it perfectly" )
-            for hint in hints:
-                # set the FILLED section
-                # slice[left:left+hint] = Board.FILLED    # can't get changes this way
-                for x in range( left, left+hint ):
-                    if slice[x] != Board.FILLED:
-                        slice[x] = Board.FILLED
-                        changed.append( x )
-                left += hint
-                if left < full_width:    # Add a blank if we're not at end
-                    if slice[left] != Board.BLANK:
-                        slice[left] = Board.BLANK
-                        changed.append( left )
-                    left += 1
-            return ( changed, 0, True )
-
-        # The big hammer
-        ( changed_idxs, valid_moves ) = self.recursive_solve( slice, hints, rowcol, available, left, right, force )
-        if not changed_idxs:
-            return ( changed_idxs, valid_moves, False )
-        
-        # check if line is done from the big hammer
-        idx = -1                        # haven't found one yet
-        fills = False
-        found = []
-        for x in range( full_width ):
-            if not fills:               # we were not in filled area, look for one
-                if slice[x] == Board.FILLED:
-                    fills = True
-                    found.append(1)     # 1 block fill so far
-                    idx += 1
-                    if idx >= len( hints ):
-                        raise SolveError( f"* Step {self.step:>4} {rowcol} - {slice} exceeds {hints}" )
-                    continue
-            else:                       # we were in a filled area, look for non-filled
-                if slice[x] == Board.FILLED: # continuing filled
-                    found[idx] += 1
-                else:
-                    fills = False
-                    if found[idx] != hints[idx]:
-                        break
-        
-        # We're done!
-        if found == hints:
-            if config.args.verbose >= VERBOSE_SOME:
+            # this can kick in later as left and right move in, so look for actual changes
+            if verbose >= VERBOSE_SOME:
+                output(  f"- Step {self.step:>4} {rowcol} - {list( hints )} fills it perfectly" )
+            # everything outside left..right is already BLANK, so it's just the hints' pattern there
+            ( cells, filled_bits ) = Board.fill_pattern( hints, hints_key )
+            filled_bits <<= left
+            bits = ( filled_bits, ( ( 1 << full_width ) - 1 ) & ~filled_bits )
+            return ( Board.set_cells( slice, cells, left ), 0, True, bits )
+
+        # FILLED cells already spell out the hints exactly?  Then there's just the one
+        #    position, everything else is BLANK and there's nothing to search
+        #    (unless tracing, which wants to see the position).  It can't unless there are
+        #    exactly as many FILLED as the hints add up to, and a popcount says so quicker
+        if force < 0 and verbose < VERBOSE_MORE and \
+                bits[0].bit_count() == hints_total - len( hints ) + 1 and Board.runs_match( bits[0], hints ):
+            ( changed_idxs, done, bits ) = Board.apply_line( slice, bits[0], ~bits[0], bits )
+            if verbose >= VERBOSE_SOME:
                 output(  f"- Step {self.step:>4} - {rowcol} - done" )
-            for x in range( full_width ):
-                if slice[x] == Board.UNKNOWN:
-                    slice[x] = Board.BLANK
-                    changed_idxs.append( x )
-            return ( changed_idxs, valid_moves, True )
+            return ( changed_idxs, 1, done, bits )
+
+        try:
+            ( changed_idxs, valid_moves, done, bits ) = self.recursive_solve( slice, hints, hints_total, hints_max, plan, hints_key, rowcol, available, left, right, force, bits )
+        except SolveError:
+            if key:
+                Board.cache_slice( key, () )
+            raise
+        if key:
+            new_cells = slice.copy() if changed_idxs else None      # an array copies back in without converting
+            Board.cache_slice( key, ( new_cells, tuple( changed_idxs ), valid_moves, done, bits ) )
+        if done and verbose >= VERBOSE_SOME:
+            output(  f"- Step {self.step:>4} - {rowcol} - done" )
         
-        return( changed_idxs, valid_moves, False )
+        return ( changed_idxs, valid_moves, done, bits )
            
 
-    def solve_next( self ) -> ( bool, bool, bool ):
+    def solve_axis( self, rows :bool ) -> bool:
         """
-        Try to find the next changes in the board, returns ( changed?, done?, dead? )
+        Solve every dirty row (or every dirty col if rows is False) once.
+        Rows come out of grid and cols out of grid_T so they're always contiguous,
+            and whatever changes dirties the crossing lines of the other axis.
+        Returns True if anything changed, and counts newly solved lines into rows_done / cols_done.
+        Raises a SolveError if a line can't be solved - with --force, as soon as a change
+            leaves a crossing line the way it was in a dead end seen before.
         """
-        
-        changes   :bool = False
-        rows_done :int  = 0
-        cols_done :int  = 0
-        
-        board.step += 1
+        if rows:
+            lines, other           = self.grid, self.grid_T
+            infos                  = config.rows_line
+            solved, moves          = self.row_solved, self.row_moves
+            todo, self.dirty_rows  = self.dirty_rows, set()     # take the whole set, it starts over empty
+            cross_dirty            = self.dirty_cols
+            filled, blank          = self.row_filled, self.row_blank
+            cross_filled, cross_blank = self.col_filled, self.col_blank
+            names                  = self.row_names
+            cross_infos, cross_names, cross_width = config.cols_line, self.col_names, config.rown
+        else:
+            lines, other           = self.grid_T, self.grid
+            infos                  = config.cols_line
+            solved, moves          = self.col_solved, self.col_moves
+            todo, self.dirty_cols  = self.dirty_cols, set()
+            cross_dirty            = self.dirty_rows
+            filled, blank          = self.col_filled, self.col_blank
+            cross_filled, cross_blank = self.row_filled, self.row_blank
+            names                  = self.col_names
+            cross_infos, cross_names, cross_width = config.rows_line, self.row_names, config.coln
 
-        # do rows
-        for y in range( config.rown ):
-            if self.row_solved[y]:
-                rows_done += 1
-                continue
-            if not self.row_changed[y]: # not done but don't bother
-                continue
-            rowstr = f"Row {y+1:>2}"
-            row = self.grid[y]    # get row y
-            ( changed, valid_moves, done ) = self.solve_slice( row, config.rows[ y ], rowstr, -1 )
-            self.row_moves[y]               = valid_moves
-            if changed:
-                if config.args.verbose >= VERBOSE_MORE:
-                    self.output_grid()
-                    
-                changes                     = True
-                self.grid[y]                = row
-                self.row_changed[y]         = True
-                for idx in changed:                 # changes in a row change columns!
-                    self.col_changed[idx]   = True
-            if done:
-                self.row_solved[y]          = True
-                rows_done += 1
-            else:
-                if not numpy.any( row == Board.UNKNOWN ):
-                    if config.args.verbose >= VERBOSE_SOME:
-                        output( f"- Step {self.step:>4} - {rowstr} - no unknowns, marking done" )
-                    self.row_solved[y]      = True
-                    rows_done += 1
-            
-        # do cols            
-        for x in range( config.coln ):
-            if self.col_solved[x]:
-                cols_done += 1
-                continue
-            if not self.col_changed[x]:
-                continue
-            colstr = f"Col {x+1:>2}"
-            col = self.grid[:,x]    # get col x
-            ( changed, valid_moves, done ) = self.solve_slice( col, config.cols[ x ], colstr, -1 )
-            self.col_moves[x] = valid_moves
+        # after a guess only the lines crossing it are dirty, so one axis has nothing to do
+        if not todo:
+            return False
+
+        # the lines in one pass don't depend on each other, so everything the loop
+        #    looks up for every line gets looked up once here instead
+        solve, note = self.solve_slice, Board.note_changes
+        verbose     = config.args.verbose
+        cache       = Board.slice_cache if config.args.force else None     # see below
+        changes = False
+        solves  = 0                 # lines marked solved this pass
+        # Lines in a pass can go in any order - none of them sees what another one changed
+        #    until the next pass, so it only shows in the output (and sorted reads better).
+        #    Fewest-moves-first doesn't buy anything here: all it can change is how soon a
+        #    dead end turns up, and the forward check below already catches most of them
+        #    early.  The fewest-moves pick that matters is pick_guess()'s.
+        if verbose:
+            todo = sorted( todo )
+        was_solved = solved.tolist()        # one conversion, not a numpy lookup per line
+        for y in todo:
+            if was_solved[y]:
+                # nothing in a solved line is UNKNOWN, so a change means a known cell got
+                #    written over - the board's contradicted itself
+                raise SolveError( f"{names[y]} illegal" )
+            line    = lines[y]
+            hints, total, most, plan, key = infos[y]       # one lookup for all of the line's hint info
+            ( changed, valid_moves, done, ( filled[y], blank[y] ) ) = solve( line, hints, total, most, plan, key, names[ y ], -1, ( filled[y], blank[y] ) )
+            moves[y] = valid_moves
             if changed:
-                if config.args.verbose >= VERBOSE_MORE: 
+                note( y, filled[y], changed, cross_filled, cross_blank )
+                if verbose >= VERBOSE_MORE:
+                    if not rows:                    # grid is only caught up at the end otherwise
+                        self.grid[:,y] = line
                     self.output_grid()
-                changes                     = True
-                self.grid[:,x]              = col
-                self.col_changed[x]         = True
-                for idx in changed:
-                    self.row_changed[idx]   = True
-            if done:
-                self.col_solved[x]          = True
-                cols_done += 1
-            else:
-                if not numpy.any( col == Board.UNKNOWN ):
-                    if config.args.verbose >= VERBOSE_SOME:
-                        output( f"- Step {self.step:>4} - {colstr} - no unknowns, marking done" )
-                    self.col_solved[x]      = True
-                    cols_done += 1
+                changes = True
+                cross_dirty.update( changed )   # changes in a row change columns and vice versa!
+                # forward check: a wrong guess mostly runs into crossing lines that were dead
+                #    ends before, and those are in the cache - one lookup each now says so
+                #    before the rest of this pass gets solved for nothing
+                if cache:
+                    for x in changed:
+                        cross_hints, _, _, _, cross_key = cross_infos[x]
+                        if cache.get( ( cross_key, cross_width, cross_filled[x], cross_blank[x] ) ) == ():
+                            raise SolveError( f"* Step {self.step:>4} {cross_names[x]} - hints ({list( cross_hints )}) - no possible solutions!" )
+            if done:                            # solve_slice() only says done once nothing's UNKNOWN
+                solved[y] = True
+                solves   += 1
+
+        if rows:
+            self.rows_done += solves
+        else:
+            self.cols_done += solves
+
+        # catch the other grid up in one copy
+        if changes:
+            numpy.copyto( other, lines.T )
+        return changes
+
+
+    def solve_next( self ) -> ( bool, bool, str ):
+        """
+        Try to find the next changes in the board, returns ( changed?, done?, dead )
+        Only looks at the rows/cols that are dirty (something in them changed since
+            we last solved them) - solving a line again without changes finds nothing new.
+        Rows dirtied by the cols wait for the next step.
+        dead is why the board can't be solved, "" if it still can be.  With --force
+            that's how every wrong guess ends, so it comes back as an answer - the
+            SolveError stops here instead of unwinding into the main loop.
+        """
         
+        board.step += 1
+
+        # nothing's changed since the last step, so there's nothing new to find (or break)
+        if not ( self.dirty_rows or self.dirty_cols ):
+            return ( False, self.rows_done == config.rown and self.cols_done == config.coln, "" )
+
+        try:
+            rows_changed = self.solve_axis( True )
+            cols_changed = self.solve_axis( False )
+            self.check_all_legal()
+        except SolveError as ex:
+            return ( False, False, str( ex ) )
+        changes      = rows_changed or cols_changed
 
         if config.args.verbose >= VERBOSE_ALL:
             output( f" rows_done {self.row_solved}   cols_done {self.col_solved}" )
 
-        done = ( rows_done == config.rown ) and ( cols_done == config.coln )
-        return ( changes, done, False )
+        done = self.rows_done == config.rown and self.cols_done == config.coln
+        return ( changes, done, "" )
     
 
-    def force_random_move( self ):
-        """
-        Not strictly random - weighted for the rows/cols with the fewest moves available.
-        Picks one with few moves and makes a random move.
-        """
-
-        # weight every row and column on the number of moves available (fewer is more weight)
-        total = 0
-        choices = []
-        max_choices = max( self.row_moves + self.col_moves )
-        for y in range(config.rown):
-            if not self.row_solved[y]:
-                weight = max_choices - self.row_moves[y]
-                choices.append( [ weight, y ] )
-                total += weight
-        for x in range(config.coln):
-            if not self.col_solved[x]:
-                weight = max_choices - self.col_moves[x]
-                choices.append( [ weight, x + 1000 ] )
-                total += weight
-        choices.sort( reverse=True )
-        
-        # might have to do this a couple times to get a legal one
-        tried = set()
-        while True:
-        
-            # generate a random number and see where that lands in all the choices
-            r = random.randrange( 0, total )
-            if r in tried:      # tried this before - TODO: check for too many repeats
-                continue
-            tried.add( r )
-            
-            if config.args.verbose >= VERBOSE_MORE:
-                output( f" {r} of {total} in {choices}" )
-            for ( weight, which ) in choices:
-                if r > weight:
-                    r -= weight
-                    continue
-                # found it!
-                weight = max_choices - weight
-                orig_grid = self.grid.copy()    # make a copy of the grid, because we might force something bad
-                if which < 1000:  # a row
-                    row = self.grid[which]
-                    rowcol = f"Row {which:>2}"
-                    # get the exact number of moves possible right now
-                    ( changed_idx, moves, done ) = self.solve_slice( row, config.rows[which], rowcol, weight )
-                    # and choose a random one
-                    move = random.randrange( 0, moves )
-                    if config.args.verbose >= VERBOSE_MORE:
-                        output( f"-  Forcing Row {which:>2} move {move}" )
-                    ( changed_idx, dummy, done ) = self.solve_slice( row, config.rows[which], rowcol, move )
-                    self.grid[which] = row
-                    # Check that we didn't do anything bad in the changed cols
-                    okay = True
-                    for idx in changed_idx:
-                        if not Board.slice_is_legal( self.grid[:,idx], config.cols[idx] ):
-                            if config.args.verbose >= VERBOSE_MORE:
-                                output( f"    Causes Col {idx:>2} to be illegal, reverting" )
-                            okay = False
-                            break
-                    if not okay:
-                        self.grid = orig_grid   # put it back
-                        continue
-                            
-                else: # a col
-                    which -= 1000
-                    col = self.grid[ :, which]
-                    rowcol = f"Col {which:>2}"
-
-                    # get the exact number of moves possible right now
-                    ( changed_idx, moves, done ) = self.solve_slice( col, config.cols[which], rowcol, weight )
-                    # and choose a random one
-                    move = random.randrange( 0, moves )
-                    output( f"-  Forcing Col {which:>2} move {move}" )
-                    ( changed_idx, dummy, done ) = self.solve_slice( col, config.cols[which], rowcol, move )
-                    self.grid[ :, which ] = col
-                    # Check that we didn't do anything bad in the changed rows
-                    okay = True
-                    for idx in changed_idx:
-                        if not Board.slice_is_legal( self.grid[idx], config.rows[idx] ):
-                            if config.args.verbose >= VERBOSE_MORE:
-                                output( f"    Causes Row {idx:>2} to be illegal, reverting" )
-                            okay = False
-                            break
-                    if not okay:
-                        self.grid = orig_grid   # put it back
-                        continue
-
-                if done:
-                    self.row_solved[which] = True
-                return
-    
-    def slice_is_legal( slice :numpy.array, hints :list[int] ) -> bool:
+    def pick_guess( self ) -> ( bool, int, int ):
         """
-        Looks at the hints to decide if what's in the slice is even legal.
+        Nothing else can be worked out, so pick a line to guess at (--force).
+        Minimum remaining values: the unsolved row or col with the fewest legal positions
+            left, so a guess is as likely to be right as it gets - and any wrong ones are
+            over quickly.  Ties go to the one with the most UNKNOWN cells (a guess there
+            settles the most), anything still tied is picked at random.
+        Returns ( rows, which, positions ) - positions is exact, the guesses are 0 .. positions-1
         """
+        rows    = numpy.flatnonzero( self.row_solved == 0 ).tolist()
+        cols    = numpy.flatnonzero( self.col_solved == 0 ).tolist()
+        moves   = numpy.concatenate( ( self.row_moves[rows], self.col_moves[cols] ) )
+        best    = numpy.flatnonzero( moves == moves.min() ).tolist()
+        if len( best ) > 1:
+            # UNKNOWN cells are the ones in neither bitmask, so that's just a popcount
+            nrows   = len( rows )
+            unknown = [ ( config.coln - ( self.row_filled[ rows[i] ] | self.row_blank[ rows[i] ] ).bit_count() ) if i < nrows else
+                        ( config.rown - ( self.col_filled[ cols[i-nrows] ] | self.col_blank[ cols[i-nrows] ] ).bit_count() ) for i in best ]
+            most    = max( unknown )
+            best    = [ i for i, u in zip( best, unknown ) if u == most ]
+        pick    = Board.rng.choice( best )
+        if pick < len( rows ):
+            rows, which, width = True, rows[pick], config.coln
+            hints, _, _, plan, key  = config.rows_line[which]
+            filled_bits, blank_bits = self.row_filled[which], self.row_blank[which]
+        else:
+            rows, which, width = False, cols[pick - len( rows )], config.rown
+            hints, _, _, plan, key  = config.cols_line[which]
+            filled_bits, blank_bits = self.col_filled[which], self.col_blank[which]
 
-        # degenerate but fast case: no hints, nothing must be filled
-        if not hints:
-            ok = not numpy.any( slice == Board.FILLED )
-            if not ok:
-                print( f"{hints} {numpy.any( slice == board.FILLED) } {slice}")
-                sys.exit(1)
-            return ok
+        # row_moves / col_moves are just a guide (they're capped for untouched lines),
+        #    the guesses have to go by the real count - the same one recursive_solve()
+        #    would get, so from the placement table if there is one
+        table = Board.placement_table( hints, plan, key, width )
+        if table is not None:
+            return ( rows, which, len( Board.fitting_placements( table, filled_bits, blank_bits ) ) )
+        left, right, available  = Board.bits_left_right_available( blank_bits, width )
+        positions = Board.tally_legal_positions( left, right, hints, plan, filled_bits, blank_bits, [ 0 ] * ( width + 1 ) )
+        return ( rows, which, positions )
 
-        left, right, available = Board.get_slice_left_right_available( slice )
-        
-        # Iterate over the possible positions
-        # Iterate over the possible positions
-        for fill_pos in Board.get_all_positions( left, right, hints ):
-            okay = True
-            end  = 0
-            for x in range( len(hints) ):
-                pos, size = fill_pos[x], hints[x]
-                if pos > end and numpy.any( slice[end:pos] == Board.FILLED ): # can't have any FILLED in before this
-                    okay = False
-                    break
-                end  = pos + size  # one PAST the end
-                if numpy.any( slice[pos:end] == Board.BLANK ):   # can't be on top of any be blank areas
-                    okay = False
-                    break
-            if not okay:
-                continue
-            if end < right and numpy.any( slice[end:] == Board.FILLED ):     # can't have any filled ones after we put all ours down
-                continue
-            
-            # if we're here it's legal
-            return True
-        
-        return False        # didn't find a single legal one
-    
+    def order_guess( self, rows :bool, which :int, positions :int ) -> list[int]:
+        """
+        Which order to try a guess's positions in (--force): least constraining first.
+            Each one gets put on the board and solved one step, and the one that leaves
+            the most positions over the whole board goes first - it's the one least likely
+            to have cut off the answer.  The dead ends the probes find land in slice_cache
+            on the way, so they're quick when they come up again.
+        Ones that solve the board come first, dead ends last.  More than PROBES_MAX
+            positions and they just go in order - that many probes cost more than they save.
+        The board (and step) are left the way they were.
+        """
+        order = list( range( positions ) )
+        if positions > Board.PROBES_MAX:
+            return order
+        snap, step = self.checkpoint(), self.step
+        score = []
+        for nth in order:
+            try:
+                self.force_line( rows, which, nth )
+                ( changed, done, dead ) = self.solve_next()
+            except SolveError as ex:
+                ( done, dead ) = ( False, str( ex ) )
+            if done:
+                score.append( -math.inf )
+            elif dead:
+                score.append( math.inf )
+            else:       # log of how many ways the unsolved lines could still go, all together - most first
+                moves = numpy.concatenate( ( self.row_moves[ self.row_solved == 0 ], self.col_moves[ self.col_solved == 0 ] ) )
+                score.append( -float( numpy.log( numpy.maximum( moves, 1 ) ).sum() ) )
+            self.restore( snap )
+        self.step = step
+        order.sort( key = lambda nth: score[nth] )
+        return order
+
+    def force_line( self, rows :bool, which :int, nth :int ) -> None:
+        """
+        Guess that row (or col if rows is False) which is in its nth legal position and
+            put that on the board, so solve_next() can see where it leads.
+        Raises a SolveError if it can't be, including when there's no nth position -
+            then nothing would change, and the search would pick the same guess forever.
+        """
+        if rows:
+            line, other, solved    = self.grid[which], self.grid_T, self.row_solved
+            hints, total, most, plan, key = config.rows_line[which]
+            filled, blank          = self.row_filled, self.row_blank
+            cross_filled, cross_blank, cross_dirty = self.col_filled, self.col_blank, self.dirty_cols
+            linestr                = self.row_names[which]
+        else:
+            line, other, solved    = self.grid_T[which], self.grid, self.col_solved
+            hints, total, most, plan, key = config.cols_line[which]
+            filled, blank          = self.col_filled, self.col_blank
+            cross_filled, cross_blank, cross_dirty = self.row_filled, self.row_blank, self.dirty_rows
+            linestr                = self.col_names[which]
+
+        ( changed, moves, done, ( filled[which], blank[which] ) ) = self.solve_slice( line, hints, total, most, plan, key, linestr, nth, ( filled[which], blank[which] ) )
+        if not done:        # a forced position settles every cell, so it wasn't forced
+            raise SolveError( f"* Step {self.step:>4} {linestr} - hints ({list( hints )}) - no position {nth+1} to guess" )
+        other[changed, which] = line[changed]
+        Board.note_changes( which, filled[which], changed, cross_filled, cross_blank )
+        cross_dirty.update( changed )
+        solved[which] = True
+        self.count_done()
 
     def check_all_legal( self ) -> None:
-        "Raises a SolveError if a Row or Col is illegal"
-    
-        for y in range(config.rown):
-            if config.rows[y]:
-                continue
-            row = self.grid[y]
-            if not Board.slice_is_legal( row, config.rows[y] ):
-                raise SolveError( f"Row {y:>2} illegal" )
-        
-        for x in range(config.coln):
-            if config.cols[x]:
-                continue
-            col = self.grid[:,x]
-            if not Board.slice_is_legal( col, config.cols[x] ):
-                raise SolveError( f"Col {x:>2} illegal" )
-       
-            
+        """
+        Raises a SolveError if a Row or Col is illegal.
+        A solved line has no UNKNOWN cells left, so it's illegal as soon as anything in it
+            changes - and the lines with changes are exactly the dirty ones, so nothing
+            else needs looking at.  solve_axis() checks each pass's lines as it takes them,
+            which leaves the rows the cols pass just dirtied.
+        """
+        solved = self.row_solved
+        for y in self.dirty_rows:
+            if solved[y]:
+                raise SolveError( f"{self.row_names[y]} illegal" )
 
 
 # ----------------------------------------------------------------------------
 # Output to console and/or file
 # ----------------------------------------------------------------------------
     
+def output_nowhere( str ):
+    "output() when there's no console or outfile to write to - __main__ swaps it in"
+    pass
+
 def output( str ):
+    "Print a line to console and outfile as asked for - one write each, print() does two"
+    line = str + "\n"
     if not config.args.quiet:
-        print( str )
+        sys.stdout.write( line )
+    if config.outfile:
+        config.outfile.write( line )
+
+def output_ansi( ansi :str, plain :str, console :bool ):
+    """
+    Print a line to console with colours if console, and to outfile without.
+    The two are passed in already made, they don't always say quite the same thing.
+    """
+    if console:
+        sys.stdout.write( ansi + "\n" )
     if config.outfile:
-        print( str, file = config.outfile )
+        config.outfile.write( plain + "\n" )
     
 
 
@@ -732,88 +1334,99 @@ if __name__ == "__main__":
         print( "And that's it!")
         sys.exit( 1 )
 
-    # set seed if specified - otherwise whatever
-    if args.seed:
-        random.seed( args.seed )
+    # always seed - there's a default, and --seed 0 is a seed too.  The solver's got its own
+    #    generator, so nothing else using random can throw a seeded run off
+    Board.rng = random.Random( args.seed )
 
     # Create the initial board and read the config file
     Board.set_output_chars( args )
     config = read_config_file( args )
+    if args.quiet and not config.outfile:   # nowhere for output() to go, so don't even look
+        output = output_nowhere
     
-    if not config.args.quiet:
-        print( f"\n* {Fore.CYAN}{args.infile}{Style.RESET_ALL} - {Fore.BLUE}{Style.BRIGHT}{config.rown} rows x {config.coln} cols{Style.RESET_ALL}\n")
-    if config.outfile:
-        print( f"\n* {args.infile} - {config.rown} rows x {config.coln} cols\n", file=config.outfile )
+    output_ansi( f"\n* {Fore.CYAN}{args.infile}{Style.RESET_ALL} - {Fore.BLUE}{Style.BRIGHT}{config.rown} rows x {config.coln} cols{Style.RESET_ALL}\n",
+                 f"\n* {args.infile} - {config.rown} rows x {config.coln} cols\n", not args.quiet )
     
     board      = Board.blank()
-    start_time = time.time()
-    board_prev = None
+    start_time = time.perf_counter()
+    # the loop goes round once a step, so everything it checks every time is looked up once here
+    ( quiet, force, verbose ) = ( args.quiet, args.force, args.verbose )
+    guesses    = []     # --force: ( checkpoint, rows, which, nth, order ) for every guess with positions left to try
 
     try:
         done = False    
         while True:
             # TODO: Combine lines for --per-line
 
-            board.output_grid()
+            # every step's board is only for -v - on a big board or with --force it's most of
+            #    the run time, and there can be hundreds of thousands of them.  The last one always shows
+            shown = done or verbose >= VERBOSE_SOME
+            if shown:
+                board.output_grid()
             if done:
                 break
 
-            try:
-                ( changed, done, dead ) = board.solve_next()
-                board.check_all_legal()
-            except SolveError as ex:
-                print( f"* {Fore.RED}{ex}{Style.RESET_ALL}" )
-                if config.outfile:
-                    print( f"* {ex}", file=config.outfile )
-                if args.force:
-                    if board_prev:
-                        # We used to keep a stack and pop back, but it's likely as anything that the
-                        # first random forced move was wrong and we could spend immense amounts of time
-                        # chasing down a board where the very first random move was totally wrong, so
-                        # just go back to the first known good board.
-                        output( f"    Reverting to previous board {board.step}" )
-                        board = board_prev.copy()
-                    else:
-                        output( "* No previous board? Failing!")
-                else: 
+            ( changed, done, dead ) = board.solve_next()
+            if dead:
+                # nothing left to try, so it's the last board
+                if not shown and ( not force or not guesses ):
+                    board.output_grid()
+                output_ansi( f"* {DEAD_ANSI}{dead}{RESET_ANSI}", f"* {dead}", True )
+                if not force:
                     break
-                
-            # print( changed, done, dead )
-            if dead: 
-                break
+                # The newest guess was wrong, so back up to just before it and try its next
+                #    position.  Only guesses with positions still left to try stay on the stack,
+                #    so the last position isn't a guess any more - it's all that's left - and
+                #    if that's wrong too the next one down was wrong.  Guesses go on the line
+                #    with the fewest positions, so the stack stays short.
+                # Jumping further back, past guesses the dead end didn't follow from, doesn't
+                #    pay here: tracking which guesses each line's known cells follow from, every
+                #    dead end on the boards tried followed from all of them - each line solve
+                #    mixes its whole line's guesses together, so within a step or two every
+                #    line depends on every guess.  The dead ends themselves do carry over, in
+                #    slice_cache, so a line that's dead under one guess is free under the next.
+                if not guesses:
+                    output_ansi( f"* {DEAD_ANSI}{Style.BRIGHT}Every guess was wrong - there's no solution!{RESET_ANSI}",
+                                 "* Every guess was wrong - there's no solution!", True )       # even with -q, like SOLVED
+                    break
+                ( snap, rows, which, nth, order ) = guesses.pop()
+                nth += 1
+                if nth + 1 < len( order ):
+                    guesses.append( ( snap, rows, which, nth, order ) )
+                output( f"    Backing up to try {'Row' if rows else 'Col'} {which+1:>2} - {nth+1} of {len( order )} positions, {len( guesses )} guesses deep" )
+                board.restore( snap )
+                board.force_line( rows, which, order[nth] )
+                continue
 
             if done:
-                end_time = time.time()
+                end_time = time.perf_counter()
                 solve_secs = end_time - start_time
-                print( f"\n*** {Fore.GREEN}{Style.BRIGHT}SOLVED!{Style.RESET_ALL} - {solve_secs:0.2f}s" )
-                if config.outfile:
-                    print( f"\n--- SOLVED! - {solve_secs:.2f}s", file=config.outfile )
-                if args.quiet:          # doesn't get printed otherwise
-                    lines = board.printable( console=True )
-                    print( "\n".join( lines ) )
+                output_ansi( f"\n*** {Fore.GREEN}{Style.BRIGHT}SOLVED!{Style.RESET_ALL} - {solve_secs:0.2f}s",
+                             f"\n--- SOLVED! - {solve_secs:.2f}s", True )       # even with -q
+                if quiet:               # doesn't get printed otherwise
+                    board.print_to( sys.stdout, console=True )
                 
             if not done and not changed:
-                board.output_grid()
-                print( f"{Fore.RED}{Style.BRIGHT}Unsolved, but couldn't find anything else to do.{Style.RESET_ALL}" )
-                if config.outfile:
-                    print( f"* Unsolved, but couldn't find anything else to do.", file=config.outfile )
+                # once per descent - stuck again under a guess is just time for the next one,
+                #    and with --force that's every step or two
+                stuck = not guesses
+                if stuck:
+                    if not shown:           # nothing changed, so it's the board from last time if that showed
+                        board.output_grid()
+                    output_ansi( STUCK_ANSI, "* Unsolved, but couldn't find anything else to do.", True )
                 
-                if args.force:
-                    if not board_prev:  # only set the 'last known good board' if we haven't been forcing it
-                        board_prev = board.copy()
-                        output( "board_prev set!" )
-                    output( f"- Switching to brute force" )
-                    while True:
-                        board = board.copy()
-                        try:
-                            board.force_random_move()
-                            break
-                        except SolveError as ex:
-                            continue
-                        except Exception as ex:
-                            print( f"Nooooooooo! {ex}" )
-                            sys.exit(1)
-                    board.output_grid()
+                if force:
+                    if stuck:
+                        output( f"- Switching to brute force" )
+                    # One search, in order.  Racing a few differently seeded ones in other
+                    #    processes would only differ where pick_guess() breaks an exact tie,
+                    #    and on the boards that take a long time every seed took about as long.
+                    ( rows, which, positions ) = board.pick_guess()
+                    order = board.order_guess( rows, which, positions )
+                    guesses.append( ( board.checkpoint(), rows, which, 0, order ) )
+                    if verbose >= VERBOSE_SOME:
+                        output( f"- Step {board.step:>4} - guessing {'Row' if rows else 'Col'} {which+1:>2} - 1 of {positions} positions, {len( guesses )} guesses deep" )
+                    board.force_line( rows, which, order[0] )
                     continue
                 else:
                     output( "   use --force to switch to brute force methods" )
@@ -823,3 +1436,6 @@ if __name__ == "__main__":
         output( "* Fatal Error" )
         output( traceback.format_exc() )
         board.output_grid()
+    finally:
+        if config.outfile:      # it's written in big blocks, so make sure the last one goes out (even on ^C)
+            config.outfile.close()